@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+from collections import Counter
+import numpy as np
+from MatchStore import load_records
+from Schema import COLUMN_IDS, NUMERIC_COLUMNS, encode_row
+
+# Per-team statistics over scouted matches. Counter values live in a NumPy column
+# store (one row per record); running sums, squared sums and counts are kept per team
+# so means and standard deviations update in O(1) as each record arrives. Medians and
+# percentiles are computed from the team's rows on demand and cached until that team
+# gets a new record.
+
+METRICS = NUMERIC_COLUMNS
+METRIC_INDEX = [COLUMN_IDS.index(m) for m in METRICS]
+CLIMB_INDEX = COLUMN_IDS.index("teleop_climb")
+BROKEN_INDEX = COLUMN_IDS.index("teleop_broken")
+STATS = ("mean", "median", "stddev", "min", "max", "p25", "p75", "p90")
+INITIAL_CAPACITY = 256
+
+
+def record_key(data):
+    return (data.get("scouter_name", ""), data.get("match_number", ""), str(data.get("team_number", "")))
+
+
+class Analytics:
+    def __init__(self):
+        self.values = np.zeros((INITIAL_CAPACITY, len(METRICS)), dtype=np.float64)
+        self.row_team = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self.rows = 0
+        self.row_of = {}          # record key -> row
+        self.teams = []           # team index -> team number
+        self.team_index = {}      # team number -> index
+        self.team_rows = []       # team index -> [rows]
+        self.sums = np.zeros((0, len(METRICS)))
+        self.sumsq = np.zeros((0, len(METRICS)))
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.broken = np.zeros(0, dtype=np.int64)
+        self.climbs = []          # team index -> Counter
+        self.row_extra = []       # row -> (climb state, broken)
+        self.percentile_cache = {}
+
+    def _team(self, team):
+        index = self.team_index.get(team)
+        if index is None:
+            index = self.team_index[team] = len(self.teams)
+            self.teams.append(team)
+            self.team_rows.append([])
+            self.climbs.append(Counter())
+            self.sums = np.vstack([self.sums, np.zeros((1, len(METRICS)))])
+            self.sumsq = np.vstack([self.sumsq, np.zeros((1, len(METRICS)))])
+            self.counts = np.append(self.counts, 0)
+            self.broken = np.append(self.broken, 0)
+        return index
+
+    def _grow(self):
+        capacity = len(self.values) * 2
+        values = np.zeros((capacity, len(METRICS)), dtype=np.float64)
+        values[:self.rows] = self.values[:self.rows]
+        row_team = np.zeros(capacity, dtype=np.int32)
+        row_team[:self.rows] = self.row_team[:self.rows]
+        self.values, self.row_team = values, row_team
+
+    def _remove_row(self, row):
+        team = self.row_team[row]
+        old = self.values[row]
+        self.sums[team] -= old
+        self.sumsq[team] -= old * old
+        climb, broken = self.row_extra[row]
+        self.climbs[team][climb] -= 1
+        self.broken[team] -= broken
+        self.counts[team] -= 1
+        self.team_rows[team].remove(row)
+
+    # Add one record; a record seen again (same scout, match and team) replaces the old one
+    def add(self, data):
+        row_values = encode_row(data)
+        team = self._team(str(data.get("team_number", "")))
+        values = np.array([float(row_values[i] or 0) for i in METRIC_INDEX])
+        climb = row_values[CLIMB_INDEX]
+        broken = 1 if str(row_values[BROKEN_INDEX]).lower() == "yes" else 0
+        key = record_key(data)
+        row = self.row_of.get(key)
+        if row is None:
+            if self.rows == len(self.values):
+                self._grow()
+            row = self.row_of[key] = self.rows
+            self.rows += 1
+            self.row_extra.append(None)
+        else:
+            self._remove_row(row)
+            self.percentile_cache.pop(int(self.row_team[row]), None)
+        self.values[row] = values
+        self.row_team[row] = team
+        self.row_extra[row] = (climb, broken)
+        self.sums[team] += values
+        self.sumsq[team] += values * values
+        self.climbs[team][climb] += 1
+        self.broken[team] += broken
+        self.counts[team] += 1
+        self.team_rows[team].append(row)
+        self.percentile_cache.pop(team, None)
+
+    def add_many(self, records):
+        for data in records:
+            self.add(data)
+
+    def _percentiles(self, team):
+        cached = self.percentile_cache.get(team)
+        if cached is None:
+            rows = self.values[self.team_rows[team]]
+            if len(rows):
+                q = np.percentile(rows, [0, 25, 50, 75, 90, 100], axis=0)
+            else:
+                q = np.zeros((6, len(METRICS)))
+            cached = self.percentile_cache[team] = dict(zip(("min", "p25", "median", "p75", "p90", "max"), q))
+        return cached
+
+    def _means(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nan_to_num(self.sums / self.counts[:, None])
+
+    def _stddevs(self):
+        means = self._means()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self.sumsq / self.counts[:, None] - means * means
+        return np.sqrt(np.clip(np.nan_to_num(var), 0, None))
+
+    # One statistic for every team as an array indexed like self.teams
+    def stat_column(self, metric, stat="mean"):
+        m = METRICS.index(metric)
+        if stat == "mean":
+            return self._means()[:, m]
+        if stat == "stddev":
+            return self._stddevs()[:, m]
+        return np.array([self._percentiles(t)[stat][m] for t in range(len(self.teams))])
+
+    def team_summary(self, team):
+        t = self.team_index[str(team)]
+        means, stddevs = self._means()[t], self._stddevs()[t]
+        percentiles = self._percentiles(t)
+        count = int(self.counts[t])
+        return {
+            "team": self.teams[t],
+            "matches": count,
+            "metrics": {metric: {"mean": means[m], "stddev": stddevs[m],
+                                 **{name: percentiles[name][m] for name in percentiles}}
+                        for m, metric in enumerate(METRICS)},
+            "climb": {state: n for state, n in self.climbs[t].items() if n},
+            "broken_rate": self.broken[t] / count if count else 0.0,
+        }
+
+    # Teams ordered best first by one statistic of one metric
+    def ranking(self, metric, stat="mean", top=None, min_matches=1):
+        column = self.stat_column(metric, stat)
+        eligible = np.nonzero(self.counts >= min_matches)[0]
+        order = eligible[np.argsort(-column[eligible], kind="stable")]
+        if top:
+            order = order[:top]
+        return [(self.teams[t], float(column[t]), int(self.counts[t])) for t in order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-team statistics from scouted matches.")
+    parser.add_argument("inputs", nargs="+", help="match_data.json, *.journal or *.jsonl files")
+    parser.add_argument("--rank", default="teleop_L4", choices=METRICS, help="metric to rank teams by")
+    parser.add_argument("--stat", default="mean", choices=STATS)
+    parser.add_argument("--top", type=int, default=24)
+    parser.add_argument("--team", help="print the full summary for one team")
+    args = parser.parse_args()
+
+    analytics = Analytics()
+    for path in args.inputs:
+        if os.path.exists(path):
+            analytics.add_many(load_records(path))
+        else:
+            print(f"Skipping missing file: {path}")
+    if args.team:
+        print(json.dumps(analytics.team_summary(args.team), indent=4, default=float))
+        return
+    print(f"{'#':>3}  {'Team':<8}{args.stat + ' ' + args.rank:>24}{'Matches':>9}")
+    for place, (team, value, count) in enumerate(analytics.ranking(args.rank, args.stat, args.top), 1):
+        print(f"{place:>3}  {team:<8}{value:>24.2f}{count:>9}")
+
+
+if __name__ == "__main__":
+    main()
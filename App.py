@@ -1,78 +1,94 @@
+import time
+# Reference point for the startup benchmark (Benchmarks/bench_startup.py)
+STARTED = time.perf_counter()
 import os
 import json
+import threading
 import tkinter
 import customtkinter
-from PIL import Image, ImageTk
-import qrcode
+from QRRender import QRRenderer
 import tkinter.filedialog as filedialog
 import tkinter.messagebox as messagebox
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from Payload import encode_payload, qr_record
+from QRStream import StreamEncoder, encode_records
+from MatchStore import MatchStore
+from SheetUploader import GspreadSheet, FakeSheet
+from UploadOutbox import UploadOutbox
+from MatchState import MatchState
+from Schedule import Schedule, STATIONS
+from MatchList import MatchList
 
 SPREADSHEET_ID = "12PUHwWSQQou5LjnwuTT-mEWn5Z42Ixny6Z-MZ8DhpDY"
 SHEET_NAME = "Raw"
 CREDENTIALS_PATH = "bubblescout-07b081651c6e.json"
+# Rows waiting for (or already sent to) the sheet, kept across restarts
+OUTBOX_FILE = "upload_outbox.journal"
+# Point BUBBLES_FAKE_SHEET at a JSON file to upload to a local fake sheet instead
+FAKE_SHEET_FILE = os.environ.get("BUBBLES_FAKE_SHEET")
 
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
+# Saved matches live in an append-only journal; the old single JSON document is
+# migrated into it the first time the app starts
 DATA_FILE = "match_data.json"
-
-def load_data():
+JOURNAL_FILE = "match_data.journal"
+
+# Matches already handed off (sent to Sheets or exported to the scanner)
+SENT_FILE = "sent_matches.json"
+
+# PIL, qrcode, NumPy (heatmaps) and gspread are imported where they are first used,
+# and the match phase frames are built the first time they are shown, so the window
+# comes up as soon as the match list exists.
+FIELD_IMAGE_FILE = "Data/startingPos.jpg"
+# Match schedule (match,red1,red2,red3,blue1,blue2,blue3); numbered matches without it
+SCHEDULE_FILE = "match_schedule.csv"
+# Driver station this tablet scouts ("Red 1" ... "Blue 3"); can be changed in the app
+DEFAULT_STATION = os.environ.get("BUBBLES_STATION", "")
+NO_STATION = "No station"
+# Set to make the app report its startup time and quit once the window is up
+STARTUP_PROBE = os.environ.get("BUBBLES_STARTUP_PROBE")
+
+def load_sent():
     try:
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
+        with open(SENT_FILE, "r") as f:
+            return set(json.load(f))
     except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+        return set()
 
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+def save_sent(sent):
+    with open(SENT_FILE, "w") as f:
+        json.dump(sorted(sent), f)
 
-saved_matches = load_data()
+saved_matches = MatchStore(JOURNAL_FILE, legacy_path=DATA_FILE)
+sent_matches = load_sent()
+schedule = Schedule.load(SCHEDULE_FILE)
 
-selected_color = None
-current_match = None
-team_number = ""
-counters = {"L1": 0, "L2": 0, "L3": 0, "L4": 0,
-            "Algae Removed": 0, "Algae Processed": 0, "Algae Netted": 0}
-moved_state = "No"
-action_history = []
 auto_counter_labels = {}
-teleop_counters = {"L1": 0, "L2": 0, "L3": 0, "L4": 0,
-                   "Algae Removed": 0, "Algae Processed": 0, "Algae Netted": 0}
-teleop_history = []
-climb_state = "No barge"
-teleop_broken_state = "No"
-robot_coords = None
+teleop_counter_labels = {}
+teleop_counter_labels_extra = {}
+# Widgets of the lazily built phase frames; None until built
+moved_button = None
+broken_btn = None
+climb_dropdown = None
+auto_comment_box = None
+teleop_comment_box = None
 MAX_COMMENT_LENGTH = 100
+# Encode QR codes in the compact payload format instead of full JSON
+COMPACT_QR = True
+# Frames per second shown when exporting many matches as a QR stream
+EXPORT_FPS = 4
 last_data_str = ""
 
-# Reset all global values and UI elements when selecting a new match.
-def reset_current_state():
-    global team_number, counters, moved_state, teleop_counters, climb_state, teleop_broken_state, robot_coords
-    team_number = ""
-    counters = {"L1": 0, "L2": 0, "L3": 0, "L4": 0,
-                "Algae Removed": 0, "Algae Processed": 0, "Algae Netted": 0}
-    moved_state = "No"
-    teleop_counters = {"L1": 0, "L2": 0, "L3": 0, "L4": 0,
-                       "Algae Removed": 0, "Algae Processed": 0, "Algae Netted": 0}
-    climb_state = "No barge"
-    teleop_broken_state = "No"
-    robot_coords = None
+# Reset the match state and the input widgets when selecting a new match.
+# Counter labels, toggle buttons and the climb dropdown follow from the state.
+def reset_current_state(match=None):
+    state.reset(match)
     team_number_entry.configure(state="normal")
     team_number_entry.delete(0, "end")
     red_button.configure(state="normal")
     blue_button.configure(state="normal")
-    auto_comment_box.delete("1.0", "end")
-    teleop_comment_box.delete("1.0", "end")
-    for label in auto_counter_labels.values():
-        key = label.cget("text").split(":")[0]
-        label.configure(text=f"{key}: 0")
-    for label in teleop_counter_labels.values():
-        key = label.cget("text").split(":")[0]
-        label.configure(text=f"{key}: 0")
-    for label in teleop_counter_labels_extra.values():
-        key = label.cget("text").split(":")[0]
-        label.configure(text=f"{key}: 0")
+    for box in (auto_comment_box, teleop_comment_box):
+        if box is not None:
+            box.delete("1.0", "end")
 
 def update_auto_comment_count(event=None):
     text = auto_comment_box.get("1.0", "end-1c")
@@ -84,70 +100,74 @@ def update_teleop_comment_count(event=None):
     remaining = MAX_COMMENT_LENGTH - len(text)
     teleop_comment_count_label.configure(text=f"{remaining} characters remaining")
 
-def generate_qr_codes(data_str):
-    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)
-    qr.add_data(data_str)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    return [ImageTk.PhotoImage(img)]
-
-def flatten_data(data):
-    flattened = []
-    flattened.append(data.get("match_number", ""))
-    flattened.append(data.get("team_number", ""))
-    flattened.append(data.get("selected_color", ""))
-    flattened.append(data.get("scouter_name", ""))
-    auto = data.get("auto", {})
-    auto_counters = auto.get("counters", {})
-    for key in ["L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted"]:
-        flattened.append(auto_counters.get(key, 0))
-    flattened.append(auto.get("moved_state", ""))
-    starting_pos = auto.get("starting_pos")
-    flattened.append(",".join(map(str, starting_pos)) if starting_pos else "")
-    flattened.append(auto.get("comment", ""))
-    teleop = data.get("teleop", {})
-    teleop_counters = teleop.get("counters", {})
-    for key in ["L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted"]:
-        flattened.append(teleop_counters.get(key, 0))
-    flattened.append(teleop.get("climb_state", ""))
-    flattened.append(teleop.get("teleop_broken_state", ""))
-    flattened.append(teleop.get("comment", ""))
-    return flattened
-
-def update_google_sheet(json_data, spreadsheet_id, sheet_name, credentials_path):
-    scope = ['https://www.googleapis.com/auth/spreadsheets',
-             'https://www.googleapis.com/auth/drive']
-    creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open_by_key(spreadsheet_id)
-    try:
-        sheet = spreadsheet.worksheet(sheet_name)
-    except gspread.exceptions.WorksheetNotFound:
-        sheet = spreadsheet.add_worksheet(title=sheet_name, rows="100", cols="26")
-    if not sheet.row_values(1):
-        header_row1 = ["Info", "", "", "", "Auto", "", "", "", "", "", "", "", "", "", "TeleOp", "", "", "", "", "", "", "", "", "", ""]
-        header_row2 = ["Match", "Team", "Alliance", "Scout Name",
-                       "L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted", "Move State",
-                       "Starting Pos", "Comment",
-                       "L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted", "Climb State",
-                       "Broken", "Comment"]
-        sheet.update(values=[header_row1, header_row2], range_name="A1:X2")
-    flattened_data = flatten_data(json_data)
-    sheet.append_row(flattened_data, value_input_option="USER_ENTERED")
-    messagebox.showinfo("Google Sheets", "Data appended to Google Sheets successfully.")
+def to_photo(img):
+    from PIL import ImageTk
+    return ImageTk.PhotoImage(img)
+
+field_images = {}
+
+# Decode the field image, and its mirrored Blue view, off the Tk thread at startup
+def load_field_images():
+    from PIL import Image
+    image = Image.open(FIELD_IMAGE_FILE)
+    image.load()
+    field_images["Red"] = image
+    field_images["Blue"] = image.transpose(Image.FLIP_LEFT_RIGHT)
+
+field_loader = threading.Thread(target=load_field_images, daemon=True)
+field_loader.start()
+
+def get_field_images():
+    field_loader.join()
+    return field_images
+
+# Text of a comment box, or "" if its phase frame has not been built yet
+def read_comment(box):
+    if box is None:
+        return ""
+    return box.get("1.0", "end").strip()[:MAX_COMMENT_LENGTH]
+
+# Text encoded in the QR code for a match record
+def qr_payload(data):
+    data = qr_record(data)
+    return encode_payload(data) if COMPACT_QR else json.dumps(data)
+
+# Render QR codes for every saved match in the background so selecting one is instant
+def prewarm_qr_codes():
+    qr_renderer.prewarm(qr_payload(data) for data in saved_matches.values())
+
+def make_sheet():
+    if FAKE_SHEET_FILE:
+        return FakeSheet(FAKE_SHEET_FILE)
+    return GspreadSheet(SPREADSHEET_ID, SHEET_NAME, CREDENTIALS_PATH)
 
 def send_to_google_sheets():
-    if current_match in saved_matches:
-        json_data = saved_matches[current_match]
+    if state.match in saved_matches:
+        json_data = saved_matches[state.match]
     else:
         update_last_data_str()
         json_data = json.loads(last_data_str)
-    update_google_sheet(json_data, SPREADSHEET_ID, SHEET_NAME, CREDENTIALS_PATH)
+    # Uploads happen on the outbox thread; the UI only shows the queue status
+    upload_outbox.enqueue(state.match, json_data)
+    update_upload_status()
+
+def update_upload_status():
+    status = upload_outbox.status()
+    text = f"Uploads: {status['pending']} pending, {status['sent']} sent"
+    if status["uploading"]:
+        text += "\nSending..."
+    elif status["last_error"] and status["pending"]:
+        text += "\nOffline - will retry"
+    upload_status_label.configure(text=text)
+
+def poll_upload_status():
+    update_upload_status()
+    root.after(1000, poll_upload_status)
 
 # New helper functions for copy/download: (Not used as per current instructions)
 def get_match_data():
-    if current_match in saved_matches:
-        return json.dumps(saved_matches[current_match])
+    if state.match in saved_matches:
+        return json.dumps(saved_matches[state.match])
     else:
         update_last_data_str()
         return last_data_str
@@ -162,54 +182,149 @@ def download_data():
     data_str = get_match_data()
     folder = filedialog.askdirectory(title="Select download folder")
     if folder:
-        file_path = os.path.join(folder, f"{team_number}_{current_match}.json")
+        file_path = os.path.join(folder, f"{state.team}_{state.match}.json")
         with open(file_path, "w") as f:
             f.write(data_str)
         messagebox.showinfo("Downloaded", f"Match data saved to:\n{file_path}")
 
+# Show every unsent saved match as an auto-cycling stream of fountain-coded QR frames.
+# The scanner can start at any frame and make up missed frames from later ones.
+def export_unsent_matches():
+    unsent = [m for m in saved_matches
+              if m not in sent_matches and not upload_outbox.is_sent(m, saved_matches[m])]
+    if not unsent:
+        messagebox.showinfo("Export", "All saved matches have already been sent.")
+        return
+    encoder = StreamEncoder(encode_records([saved_matches[m] for m in unsent]))
+    window = customtkinter.CTkToplevel(root)
+    window.title("Export Unsent Matches")
+    customtkinter.CTkLabel(window, text=f"{len(unsent)} matches in {encoder.k} blocks - keep scanning until the scanner finishes",
+                           font=("Arial", 14)).pack(pady=5)
+    qr_label = customtkinter.CTkLabel(window, text="")
+    qr_label.pack(pady=5)
+    frame_label = customtkinter.CTkLabel(window, text="")
+    frame_label.pack(pady=5)
+    # Frames render on the QR thread; the next one is prewarmed while this one shows
+    def show_frame(seq):
+        if not window.winfo_exists():
+            return
+        qr_renderer.request(encoder.frame(seq), lambda photo: display_frame(seq, photo))
+        qr_renderer.prewarm([encoder.frame(seq + 1)])
+    def display_frame(seq, photo):
+        if not window.winfo_exists():
+            return
+        qr_label.configure(image=photo)
+        qr_label.image = photo
+        frame_label.configure(text=f"Frame {seq + 1}")
+        window.after(int(1000 / EXPORT_FPS), show_frame, seq + 1)
+    def mark_sent():
+        sent_matches.update(unsent)
+        save_sent(sent_matches)
+        window.destroy()
+    button_frame = customtkinter.CTkFrame(window)
+    button_frame.pack(pady=10)
+    customtkinter.CTkButton(button_frame, text="Scanned - Mark Sent", command=mark_sent, width=150).pack(side="left", padx=10)
+    customtkinter.CTkButton(button_frame, text="Close", command=window.destroy, width=150).pack(side="left", padx=10)
+    show_frame(0)
+
+heatmaps = None
+
+# Starting-position heatmaps are built from saved matches the first time they are shown
+def get_heatmaps():
+    global heatmaps
+    if heatmaps is None:
+        from Heatmap import StartHeatmaps
+        heatmaps = StartHeatmaps(get_field_images()["Red"])
+        heatmaps.add_many(saved_matches.values())
+    return heatmaps
+
+def show_heatmaps():
+    from Heatmap import ALLIANCES
+    maps = get_heatmaps()
+    teams = maps.teams()
+    if not teams:
+        messagebox.showinfo("Heatmaps", "No saved matches have a starting position yet.")
+        return
+    window = customtkinter.CTkToplevel(root)
+    window.title("Starting Position Heatmaps")
+    controls = customtkinter.CTkFrame(window)
+    controls.pack(pady=5)
+    team_box = customtkinter.CTkComboBox(controls, values=teams, width=120)
+    team_box.pack(side="left", padx=10)
+    alliance_box = customtkinter.CTkSegmentedButton(controls, values=list(ALLIANCES))
+    alliance_box.pack(side="left", padx=10)
+    image_label = customtkinter.CTkLabel(window, text="")
+    image_label.pack(pady=5)
+    photos = {}  # (team, alliance, version) -> PhotoImage
+    def redraw(*args):
+        team, alliance = team_box.get(), alliance_box.get()
+        key = (team, alliance, maps.versions.get(team, 0))
+        if key not in photos:
+            photos[key] = to_photo(maps.render(team, alliance))
+        image_label.configure(image=photos[key])
+    team_box.configure(command=redraw)
+    alliance_box.configure(command=redraw)
+    team_box.set(teams[0])
+    alliance_box.set("Both")
+    redraw()
+
 def update_last_data_str():
-    global team_number, last_data_str, robot_coords
-    team_number = team_number_entry.get().strip()
-    auto_comment = auto_comment_box.get("1.0", "end-1c")[:MAX_COMMENT_LENGTH]
-    teleop_comment = teleop_comment_box.get("1.0", "end-1c")[:MAX_COMMENT_LENGTH]
-    data = {
-        "match_number": current_match,
-        "team_number": team_number,
-        "selected_color": selected_color,
-        "scouter_name": scouter_name_entry.get().strip(),
-        "auto": {"counters": counters, "moved_state": moved_state, "robot_coords": robot_coords,
-                 "climb_state": "N/A", "comment": auto_comment},
-        "teleop": {"counters": teleop_counters, "climb_state": climb_state,
-                   "teleop_broken_state": teleop_broken_state, "comment": teleop_comment}
-    }
+    global last_data_str
+    state.update(team=team_number_entry.get().strip())
+    data = state.to_record(scouter_name_entry.get().strip(),
+                           read_comment(auto_comment_box), read_comment(teleop_comment_box))
     last_data_str = json.dumps(data)
 
-def update_qr_code_in_container(container):
-    update_last_data_str()
+def update_qr_code_in_container(container, data):
     global qr_codes, current_qr_index, last_data_str
-    qr_codes = generate_qr_codes(last_data_str)
+    last_data_str = json.dumps(data)
+    qr_codes = []
     current_qr_index = 0
     for widget in container.winfo_children():
         widget.destroy()
     # (Copy/Download buttons removed as per instructions)
-    if qr_codes:
-        customtkinter.CTkLabel(container, image=qr_codes[current_qr_index], text="").pack(pady=10)
+    qr_label = customtkinter.CTkLabel(container, text="Rendering QR code...")
+    qr_label.pack(pady=10)
+    def show_qr(photo):
+        global qr_codes
+        # The user may have moved on to another match while this one rendered
+        if qr_label.winfo_exists():
+            qr_codes = [photo]
+            qr_label.configure(image=photo, text="")
+    qr_renderer.request(qr_payload(data), show_qr)
 
 def on_match_select(match):
-    reset_current_state()
-    global current_match
-    current_match = match
+    reset_current_state(match)
     team_frame.pack_forget()
     saved_data_label.pack_forget()
     edit_button.pack_forget()
+    send_button.pack_forget()
     if 'qr_container' in globals():
         qr_container.destroy()
     if match in saved_matches:
         display_saved_data(match)
     else:
         team_title_label.configure(text="Select Team")
+        # Fill in the robot this station scouts, from the schedule
+        team, color = schedule.assignment(match, station_box.get())
+        if team:
+            team_number_entry.insert(0, team)
+        if color:
+            select_team_color(color)
         team_frame.pack(pady=20)
 
+# Match list row label: match name, the station's team and a mark once saved
+def describe_match(index):
+    name = schedule.names[index]
+    team, _ = schedule.assignment(name, station_box.get())
+    text = f"{name} - {team}" if team else name
+    return text + "  \u2713" if name in saved_matches else text
+
+# Show only the matches of the team typed in the filter box
+def filter_matches(event=None):
+    team = team_filter_entry.get().strip()
+    match_list.set_rows(schedule.matches_for(team) if team else range(len(schedule)))
+
 def display_saved_data(match):
     data = saved_matches[match]
     team_number_entry.configure(state="normal")
@@ -227,11 +342,12 @@ def display_saved_data(match):
     saved_data_label.configure(text=summary)
     saved_data_label.pack(pady=5)
     edit_button.pack(pady=5)
+    send_button.pack(pady=5)
     team_frame.pack(pady=20)
     global qr_container
     qr_container = customtkinter.CTkFrame(team_frame)
     qr_container.pack(pady=5)
-    update_qr_code_in_container(qr_container)
+    update_qr_code_in_container(qr_container, data)
 
 def edit_match_data():
     team_number_entry.configure(state="normal")
@@ -239,102 +355,78 @@ def edit_match_data():
     blue_button.configure(state="normal")
     saved_data_label.pack_forget()
     edit_button.pack_forget()
+    send_button.pack_forget()
 
 def select_team_color(color):
-    global selected_color
-    selected_color = color
-    if color == "Red":
-        red_button.configure(fg_color="red")
-        blue_button.configure(fg_color="gray")
-    else:
-        blue_button.configure(fg_color="blue")
-        red_button.configure(fg_color="gray")
+    state.update(color=color)
+
+def render_color(state):
+    default = customtkinter.ThemeManager.theme["CTkButton"]["fg_color"]
+    red_button.configure(fg_color="red" if state.color == "Red" else "gray" if state.color else default)
+    blue_button.configure(fg_color="blue" if state.color == "Blue" else "gray" if state.color else default)
 
 def start_match():
-    global team_number
-    team_number = team_number_entry.get().strip()
+    state.update(team=team_number_entry.get().strip())
+    # Timeline timestamps count from here
+    state.start_timeline()
     field_frame.pack_forget()
     left_frame.pack_forget()
     show_starting_position()
 
 def show_starting_position():
-    start_position_frame.pack(fill="both", expand=True)
+    get_phase_frame("start").pack(fill="both", expand=True)
     draw_starting_canvas()
 
 def draw_starting_canvas():
-    global robot_coords, sp_image_tk
-    sp_image = sp_img.transpose(Image.FLIP_LEFT_RIGHT) if selected_color == "Blue" else sp_img
-    sp_image_tk = ImageTk.PhotoImage(sp_image)
-    position_canvas.delete("all")
-    position_canvas.create_image(0, 0, anchor="nw", image=sp_image_tk)
-    text_color = "red" if selected_color == "Red" else "blue"
-    position_canvas.create_text(5, 5, text=f"Team {team_number} - {selected_color}",
-                                fill=text_color, font=("Arial", 16, "bold"), anchor="nw")
-    rect_size = 40
-    robot_rect = position_canvas.create_rectangle(10, 10, 10 + rect_size, 10 + rect_size,
-                                                  fill="red", outline="black")
-    robot_coords = position_canvas.coords(robot_rect)
-    drag_data = {"x": 0, "y": 0, "item": None}
-    def on_button_press(event):
-        clicked = position_canvas.find_closest(event.x, event.y)
-        if clicked and clicked[0] == robot_rect:
-            drag_data["item"] = robot_rect
-            drag_data["x"] = event.x
-            drag_data["y"] = event.y
-    def on_button_release(event):
-        drag_data["item"] = None
-    def on_motion(event):
-        global robot_coords
-        if drag_data["item"]:
-            x1, y1, x2, y2 = position_canvas.coords(robot_rect)
-            dx = event.x - drag_data["x"]
-            dy = event.y - drag_data["y"]
-            if x1 + dx < 0:
-                dx = -x1
-            elif x2 + dx > sp_width:
-                dx = sp_width - x2
-            if y1 + dy < 0:
-                dy = -y1
-            elif y2 + dy > sp_height:
-                dy = sp_height - y2
-            position_canvas.move(robot_rect, dx, dy)
-            drag_data["x"] = event.x
-            drag_data["y"] = event.y
-            robot_coords = position_canvas.coords(robot_rect)
-    position_canvas.bind("<ButtonPress-1>", on_button_press)
-    position_canvas.bind("<ButtonRelease-1>", on_button_release)
-    position_canvas.bind("<B1-Motion>", on_motion)
-
-def update_counter(counter_dict, label_dicts, key, delta, history):
-    old = counter_dict[key]
-    counter_dict[key] = old + delta
+    starting_canvas.reset(state.team, state.color)
+
+def on_robot_moved(coords):
+    state.update(robot_coords=coords)
+
+def render_counter(phase, key, value):
+    label_dicts = [auto_counter_labels] if phase == "auto" else [teleop_counter_labels, teleop_counter_labels_extra]
     for labels in label_dicts:
         if key in labels:
-            labels[key].configure(text=f"{key}: {counter_dict[key]}")
-    history.append(("counter", key, old))
+            labels[key].configure(text=f"{key}: {value}")
+
+def render_toggles(state):
+    if moved_button is not None:
+        moved_button.configure(text=f"Moved away from middle: {state.moved()}")
+    if broken_btn is not None:
+        broken_btn.configure(text=f"Broken: {state.broken()}")
+
+def render_climb(state):
+    if climb_dropdown is not None:
+        climb_dropdown.set(state.climb)
+
+def update_counter(phase, key, delta):
+    state.record(phase, key, delta)
 
 def auto_increment(key):
-    update_counter(counters, [auto_counter_labels], key, 1, action_history)
+    update_counter("auto", key, 1)
 
 def auto_decrement(key):
-    update_counter(counters, [auto_counter_labels], key, -1, action_history)
+    update_counter("auto", key, -1)
 
 def toggle_moved():
-    global moved_state
-    old = moved_state
-    moved_state = "Yes" if moved_state == "No" else "No"
-    moved_button.configure(text=f"Moved away from middle: {moved_state}")
-    action_history.append(("toggle", old))
+    state.toggle("auto", "moved")
+
+# Undo/redo the latest tap of the phase on screen
+def undo_action(phase):
+    state.undo(phase)
+
+def redo_action(phase):
+    state.redo(phase)
 
 def show_phase3():
-    start_position_frame.pack_forget()
-    phase3_frame.pack(fill="both", expand=True)
+    get_phase_frame("start").pack_forget()
+    get_phase_frame("auto").pack(fill="both", expand=True)
 
 def teleop_increment(key):
-    update_counter(teleop_counters, [teleop_counter_labels, teleop_counter_labels_extra], key, 1, teleop_history)
+    update_counter("teleop", key, 1)
 
 def teleop_decrement(key):
-    update_counter(teleop_counters, [teleop_counter_labels, teleop_counter_labels_extra], key, -1, teleop_history)
+    update_counter("teleop", key, -1)
 
 def teleop_press_algae():
     teleop_increment("Algae Processed")
@@ -342,62 +434,39 @@ def teleop_press_algae():
 def teleop_algae_decrement():
     teleop_decrement("Algae Processed")
 
-def teleop_toggle_moved():
-    global climb_state
-    old = climb_state
-    climb_state = "Yes" if climb_state == "No" else "No"
-    teleop_history.append(("toggle", old))
-
 def toggle_broken():
-    global teleop_broken_state
-    teleop_broken_state = "YES" if teleop_broken_state == "NO" else "NO"
-    broken_btn.configure(text=f"Broken: {teleop_broken_state}")
-    teleop_history.append(("broken", teleop_broken_state))
+    state.toggle("teleop", "broken")
 
 def show_teleop():
-    phase3_frame.pack_forget()
-    teleop_frame.pack(fill="both", expand=True)
+    get_phase_frame("auto").pack_forget()
+    get_phase_frame("teleop").pack(fill="both", expand=True)
 
 def set_climb_state(val):
-    global climb_state
-    climb_state = val
+    state.update(climb=val)
 
 def end_match():
     update_match_data()
     reset_to_match_selection()
 
 def update_match_data():
-    auto_comment = auto_comment_box.get("1.0", "end").strip()[:MAX_COMMENT_LENGTH]
-    teleop_comment = teleop_comment_box.get("1.0", "end").strip()[:MAX_COMMENT_LENGTH]
-    data = {
-        "match_number": current_match,
-        "team_number": team_number,
-        "selected_color": selected_color,
-        "auto": {"counters": counters, "moved_state": moved_state, "robot_coords": robot_coords,
-                 "climb_state": "N/A", "comment": auto_comment},
-        "teleop": {"counters": teleop_counters, "climb_state": climb_state,
-                   "teleop_broken_state": teleop_broken_state, "comment": teleop_comment}
-    }
-    saved_matches[current_match] = data
-    save_data(saved_matches)
+    data = state.to_record(scouter_name_entry.get().strip(),
+                           read_comment(auto_comment_box), read_comment(teleop_comment_box))
+    # UTC save time; MergeTool keeps the newest copy when tablets disagree
+    data["saved_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    saved_matches[state.match] = data
+    # An edited match has to be exported again
+    if state.match in sent_matches:
+        sent_matches.discard(state.match)
+        save_sent(sent_matches)
+    match_list.refresh()
+    qr_renderer.prewarm([qr_payload(data)])
+    if heatmaps is not None:
+        heatmaps.add(data)
 
 def reset_to_match_selection():
-    global selected_color, current_match, team_number, counters, moved_state, action_history
-    global teleop_counters, teleop_history, climb_state, teleop_broken_state, robot_coords
-    selected_color = None
-    current_match = None
-    team_number = ""
-    counters = {k: 0 for k in counters}
-    moved_state = "No"
-    action_history = []
-    teleop_counters = {k: 0 for k in teleop_counters}
-    teleop_history = []
-    climb_state = "No barge"
-    teleop_broken_state = "No"
-    robot_coords = None
-    phase3_frame.pack_forget()
-    teleop_frame.pack_forget()
-    start_position_frame.pack_forget()
+    state.reset()
+    for frame in phase_frames.values():
+        frame.pack_forget()
     field_frame.pack(fill="both", expand=True)
     left_frame.pack(side="left", fill="y")
 
@@ -405,18 +474,33 @@ root = customtkinter.CTk()
 root.geometry("1200x720")
 root.title("Scouting App")
 root.configure(bg="light blue")
+qr_renderer = QRRenderer(root, to_photo)
+state = MatchState(root.after_idle)
+# Upsert so re-sending an edited match updates its row instead of adding another
+upload_outbox = UploadOutbox(OUTBOX_FILE, make_sheet, uploader_options={"upsert": True})
 
 # Left side: Match selection and (Google Sheets section removed)
 left_frame = customtkinter.CTkFrame(root, width=300, height=720)
 left_frame.pack(side="left", fill="y")
-match_scrollable = customtkinter.CTkScrollableFrame(left_frame, width=280, height=500)
-match_scrollable.pack(pady=20, padx=10, fill="both", expand=True)
-num_matches = 62
-for i in range(num_matches):
-    match = f"Match {i+1}"
-    customtkinter.CTkButton(match_scrollable, text=match, command=lambda m=match: on_match_select(m)).pack(pady=5, padx=10)
+list_controls = customtkinter.CTkFrame(left_frame)
+list_controls.pack(pady=(20, 0), padx=10)
+station_box = customtkinter.CTkComboBox(list_controls, values=[NO_STATION] + STATIONS, width=120,
+                                        command=lambda val: match_list.refresh())
+station_box.set(DEFAULT_STATION if DEFAULT_STATION in STATIONS else NO_STATION)
+station_box.pack(side="left", padx=5)
+team_filter_entry = customtkinter.CTkEntry(list_controls, width=110, placeholder_text="Filter team")
+team_filter_entry.pack(side="left", padx=5)
+team_filter_entry.bind("<KeyRelease>", filter_matches)
+match_list = MatchList(left_frame, describe_match, lambda index: on_match_select(schedule.names[index]))
+match_list.pack(pady=10, padx=10, fill="both", expand=True)
+match_list.set_rows(range(len(schedule)))
+customtkinter.CTkButton(left_frame, text="Export Unsent", command=export_unsent_matches).pack(pady=10, padx=10)
+customtkinter.CTkButton(left_frame, text="Start Heatmaps", command=show_heatmaps).pack(pady=5, padx=10)
+upload_status_label = customtkinter.CTkLabel(left_frame, text="", font=("Arial", 12))
+upload_status_label.pack(pady=5, padx=10)
 saved_data_label = customtkinter.CTkLabel(root, text="", font=("Arial", 14))
 edit_button = customtkinter.CTkButton(root, text="Edit", command=edit_match_data, width=150)
+send_button = customtkinter.CTkButton(root, text="Send to Sheets", command=send_to_google_sheets, width=150)
 
 # Right side: Phases container
 right_frame = customtkinter.CTkFrame(root, width=900, height=720)
@@ -448,90 +532,130 @@ blue_button = customtkinter.CTkButton(team_button_frame, text="Blue", command=la
 blue_button.pack(side="left", padx=20)
 customtkinter.CTkButton(team_frame, text="START", command=start_match, width=150).pack(pady=20)
 
+# Match phase frames, built on first use by get_phase_frame
+phase_frames = {}
+
+def get_phase_frame(name):
+    if name not in phase_frames:
+        phase_frames[name] = PHASE_BUILDERS[name]()
+        # Show the current counters and toggles on the new widgets
+        state.refresh()
+    return phase_frames[name]
+
 # Starting position section
-start_position_frame = customtkinter.CTkFrame(phase_container)
-sp_img = Image.open("Data/startingPos.jpg")
-sp_width, sp_height = sp_img.size
-position_canvas = tkinter.Canvas(start_position_frame, width=sp_width, height=sp_height, highlightthickness=0)
-position_canvas.pack()
-bottom_frame = customtkinter.CTkFrame(start_position_frame)
-bottom_frame.pack(pady=10)
-customtkinter.CTkButton(bottom_frame, text="START", width=150, command=show_phase3).pack(pady=5)
-customtkinter.CTkLabel(bottom_frame, text="Do not start until match starts", font=("Arial", 12)).pack(pady=5)
+def build_start_position_frame():
+    global position_canvas, starting_canvas
+    from FieldCanvas import StartingCanvas
+    images = get_field_images()
+    start_position_frame = customtkinter.CTkFrame(phase_container)
+    sp_width, sp_height = images["Red"].size
+    position_canvas = tkinter.Canvas(start_position_frame, width=sp_width, height=sp_height, highlightthickness=0)
+    position_canvas.pack()
+    starting_canvas = StartingCanvas(position_canvas, images["Red"], to_photo, on_move=on_robot_moved,
+                                     flipped_image=images["Blue"])
+    bottom_frame = customtkinter.CTkFrame(start_position_frame)
+    bottom_frame.pack(pady=10)
+    customtkinter.CTkButton(bottom_frame, text="START", width=150, command=show_phase3).pack(pady=5)
+    customtkinter.CTkLabel(bottom_frame, text="Do not start until match starts", font=("Arial", 12)).pack(pady=5)
+    return start_position_frame
 
 # Auto (Phase 3) section
-phase3_frame = customtkinter.CTkFrame(phase_container)
-l_frame = customtkinter.CTkFrame(phase3_frame)
-l_frame.pack(pady=10)
-auto_counter_labels = {}
-for btn_name in ["L1", "L2", "L3", "L4"]:
-    frame = customtkinter.CTkFrame(l_frame)
-    frame.pack(side="left", padx=5)
-    label = customtkinter.CTkLabel(frame, text=f"{btn_name}: 0", width=60)
-    label.pack(side="top")
-    customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=btn_name: update_counter(counters, [auto_counter_labels], k, -1, action_history)).pack(side="left")
-    customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=btn_name: update_counter(counters, [auto_counter_labels], k, 1, action_history)).pack(side="left")
-    auto_counter_labels[btn_name] = label
-extra_keys = ["Algae Removed", "Algae Processed", "Algae Netted"]
-extra_frame = customtkinter.CTkFrame(phase3_frame)
-extra_frame.pack(pady=10)
-for key in extra_keys:
-    frame = customtkinter.CTkFrame(extra_frame)
-    frame.pack(side="left", padx=5)
-    label = customtkinter.CTkLabel(frame, text=f"{key}: 0", width=80)
-    label.pack(side="top")
-    customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=key: update_counter(counters, [auto_counter_labels], k, -1, action_history)).pack(side="left")
-    customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=key: update_counter(counters, [auto_counter_labels], k, 1, action_history)).pack(side="left")
-    auto_counter_labels[key] = label
-moved_button = customtkinter.CTkButton(phase3_frame, text=f"Moved away from middle: {moved_state}", width=250, command=toggle_moved)
-moved_button.pack(pady=10)
-auto_comment_box = customtkinter.CTkTextbox(phase3_frame, width=300, height=100, wrap="word")
-auto_comment_box.pack(pady=5)
-auto_comment_box.bind("<KeyRelease>", lambda event: update_auto_comment_count(event))
-auto_comment_count_label = customtkinter.CTkLabel(phase3_frame, text=f"{MAX_COMMENT_LENGTH} characters remaining")
-auto_comment_count_label.pack(anchor="e", padx=10)
-customtkinter.CTkButton(phase3_frame, text="TeleOp Period", width=150, command=show_teleop).pack(pady=10)
+def build_phase3_frame():
+    global moved_button, auto_comment_box, auto_comment_count_label
+    phase3_frame = customtkinter.CTkFrame(phase_container)
+    l_frame = customtkinter.CTkFrame(phase3_frame)
+    l_frame.pack(pady=10)
+    for btn_name in ["L1", "L2", "L3", "L4"]:
+        frame = customtkinter.CTkFrame(l_frame)
+        frame.pack(side="left", padx=5)
+        label = customtkinter.CTkLabel(frame, text=f"{btn_name}: 0", width=60)
+        label.pack(side="top")
+        customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=btn_name: update_counter("auto", k, -1)).pack(side="left")
+        customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=btn_name: update_counter("auto", k, 1)).pack(side="left")
+        auto_counter_labels[btn_name] = label
+    extra_frame = customtkinter.CTkFrame(phase3_frame)
+    extra_frame.pack(pady=10)
+    for key in extra_keys:
+        frame = customtkinter.CTkFrame(extra_frame)
+        frame.pack(side="left", padx=5)
+        label = customtkinter.CTkLabel(frame, text=f"{key}: 0", width=80)
+        label.pack(side="top")
+        customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=key: update_counter("auto", k, -1)).pack(side="left")
+        customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=key: update_counter("auto", k, 1)).pack(side="left")
+        auto_counter_labels[key] = label
+    moved_button = customtkinter.CTkButton(phase3_frame, text="Moved away from middle: No", width=250, command=toggle_moved)
+    moved_button.pack(pady=10)
+    auto_undo_frame = customtkinter.CTkFrame(phase3_frame)
+    auto_undo_frame.pack(pady=5)
+    customtkinter.CTkButton(auto_undo_frame, text="Undo", width=80, command=lambda: undo_action("auto")).pack(side="left", padx=5)
+    customtkinter.CTkButton(auto_undo_frame, text="Redo", width=80, command=lambda: redo_action("auto")).pack(side="left", padx=5)
+    auto_comment_box = customtkinter.CTkTextbox(phase3_frame, width=300, height=100, wrap="word")
+    auto_comment_box.pack(pady=5)
+    auto_comment_box.bind("<KeyRelease>", lambda event: update_auto_comment_count(event))
+    auto_comment_count_label = customtkinter.CTkLabel(phase3_frame, text=f"{MAX_COMMENT_LENGTH} characters remaining")
+    auto_comment_count_label.pack(anchor="e", padx=10)
+    customtkinter.CTkButton(phase3_frame, text="TeleOp Period", width=150, command=show_teleop).pack(pady=10)
+    return phase3_frame
 
 # TeleOp section
-teleop_frame = customtkinter.CTkFrame(phase_container)
-teleop_counter_labels = {}
-teleop_l_frame = customtkinter.CTkFrame(teleop_frame)
-teleop_l_frame.pack(pady=10)
-for btn_name in ["L1", "L2", "L3", "L4"]:
-    frame = customtkinter.CTkFrame(teleop_l_frame)
-    frame.pack(side="left", padx=5)
-    label = customtkinter.CTkLabel(frame, text=f"{btn_name}: 0", width=60)
-    label.pack(side="top")
-    customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=btn_name: update_counter(teleop_counters, [teleop_counter_labels, teleop_counter_labels_extra], k, -1, teleop_history)).pack(side="left")
-    customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=btn_name: update_counter(teleop_counters, [teleop_counter_labels, teleop_counter_labels_extra], k, 1, teleop_history)).pack(side="left")
-    teleop_counter_labels[btn_name] = label
-extra_frame_teleop = customtkinter.CTkFrame(teleop_frame)
-extra_frame_teleop.pack(pady=10)
-teleop_counter_labels_extra = {}
-for key in extra_keys:
-    frame = customtkinter.CTkFrame(extra_frame_teleop)
-    frame.pack(side="left", padx=5)
-    label = customtkinter.CTkLabel(frame, text=f"{key}: 0", width=80)
-    label.pack(side="top")
-    customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=key: update_counter(teleop_counters, [teleop_counter_labels, teleop_counter_labels_extra], k, -1, teleop_history)).pack(side="left")
-    customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=key: update_counter(teleop_counters, [teleop_counter_labels, teleop_counter_labels_extra], k, 1, teleop_history)).pack(side="left")
-    teleop_counter_labels_extra[key] = label
-broken_btn = customtkinter.CTkButton(teleop_frame, text=f"Broken: {teleop_broken_state}", width=150, command=lambda: toggle_broken())
-broken_btn.pack(pady=5)
-climb_dropdown = customtkinter.CTkComboBox(teleop_frame, values=["DEEP", "SHALLOW", "PARK", "NONE"],
-                                           command=lambda val: set_climb_state(val))
-climb_dropdown.set("No barge")
-climb_dropdown.pack(pady=5)
-teleop_comment_box = customtkinter.CTkTextbox(teleop_frame, width=300, height=100, wrap="word")
-teleop_comment_box.pack(pady=5)
-teleop_comment_box.bind("<KeyRelease>", lambda event: update_teleop_comment_count(event))
-teleop_comment_count_label = customtkinter.CTkLabel(teleop_frame, text=f"{MAX_COMMENT_LENGTH} characters remaining")
-teleop_comment_count_label.pack(anchor="e", padx=10)
-def toggle_broken():
-    global teleop_broken_state
-    teleop_broken_state = "Yes" if teleop_broken_state == "No" else "No"
-    broken_btn.configure(text=f"Broken: {teleop_broken_state}")
-    teleop_history.append(("broken", teleop_broken_state))
-customtkinter.CTkButton(teleop_frame, text="End Match", width=150, command=end_match).pack(pady=5)
+def build_teleop_frame():
+    global broken_btn, climb_dropdown, teleop_comment_box, teleop_comment_count_label
+    teleop_frame = customtkinter.CTkFrame(phase_container)
+    teleop_l_frame = customtkinter.CTkFrame(teleop_frame)
+    teleop_l_frame.pack(pady=10)
+    for btn_name in ["L1", "L2", "L3", "L4"]:
+        frame = customtkinter.CTkFrame(teleop_l_frame)
+        frame.pack(side="left", padx=5)
+        label = customtkinter.CTkLabel(frame, text=f"{btn_name}: 0", width=60)
+        label.pack(side="top")
+        customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=btn_name: update_counter("teleop", k, -1)).pack(side="left")
+        customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=btn_name: update_counter("teleop", k, 1)).pack(side="left")
+        teleop_counter_labels[btn_name] = label
+    extra_frame_teleop = customtkinter.CTkFrame(teleop_frame)
+    extra_frame_teleop.pack(pady=10)
+    for key in extra_keys:
+        frame = customtkinter.CTkFrame(extra_frame_teleop)
+        frame.pack(side="left", padx=5)
+        label = customtkinter.CTkLabel(frame, text=f"{key}: 0", width=80)
+        label.pack(side="top")
+        customtkinter.CTkButton(frame, text="-", width=30, command=lambda k=key: update_counter("teleop", k, -1)).pack(side="left")
+        customtkinter.CTkButton(frame, text="+", width=30, command=lambda k=key: update_counter("teleop", k, 1)).pack(side="left")
+        teleop_counter_labels_extra[key] = label
+    broken_btn = customtkinter.CTkButton(teleop_frame, text="Broken: No", width=150, command=toggle_broken)
+    broken_btn.pack(pady=5)
+    teleop_undo_frame = customtkinter.CTkFrame(teleop_frame)
+    teleop_undo_frame.pack(pady=5)
+    customtkinter.CTkButton(teleop_undo_frame, text="Undo", width=80, command=lambda: undo_action("teleop")).pack(side="left", padx=5)
+    customtkinter.CTkButton(teleop_undo_frame, text="Redo", width=80, command=lambda: redo_action("teleop")).pack(side="left", padx=5)
+    climb_dropdown = customtkinter.CTkComboBox(teleop_frame, values=["DEEP", "SHALLOW", "PARK", "NONE"],
+                                               command=lambda val: set_climb_state(val))
+    climb_dropdown.set("No barge")
+    climb_dropdown.pack(pady=5)
+    teleop_comment_box = customtkinter.CTkTextbox(teleop_frame, width=300, height=100, wrap="word")
+    teleop_comment_box.pack(pady=5)
+    teleop_comment_box.bind("<KeyRelease>", lambda event: update_teleop_comment_count(event))
+    teleop_comment_count_label = customtkinter.CTkLabel(teleop_frame, text=f"{MAX_COMMENT_LENGTH} characters remaining")
+    teleop_comment_count_label.pack(anchor="e", padx=10)
+    customtkinter.CTkButton(teleop_frame, text="End Match", width=150, command=end_match).pack(pady=5)
+    return teleop_frame
 
+extra_keys = ["Algae Removed", "Algae Processed", "Algae Netted"]
+PHASE_BUILDERS = {"start": build_start_position_frame, "auto": build_phase3_frame, "teleop": build_teleop_frame}
+
+state.bind("counter", render_counter)
+state.bind("toggles", render_toggles)
+state.bind("color", render_color)
+state.bind("climb", render_climb)
+root.after_idle(prewarm_qr_codes)
+upload_outbox.start()
+poll_upload_status()
+
+def report_startup():
+    print(f"startup_seconds {time.perf_counter() - STARTED:.4f}", flush=True)
+    upload_outbox.stop()
+    root.destroy()
+
+if STARTUP_PROBE:
+    # Window is mapped and the first idle pass has run: the app is interactive
+    root.after_idle(lambda: root.after(0, report_startup))
 root.mainloop()
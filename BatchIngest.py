@@ -0,0 +1,182 @@
+import argparse
+import multiprocessing
+import os
+import time
+import cv2
+from pyzbar import pyzbar
+from DataReader import (parse_payload, record_key, list_images, IMAGE_EXTENSIONS, SPREADSHEET_ID,
+                        SHEET_NAME, CREDENTIALS_PATH, UPLOAD_BATCH_SIZE)
+from DecodeCascade import to_gray
+from DedupIndex import DedupIndex
+from SheetUploader import SheetUploader, GspreadSheet
+from Sinks import JsonLinesSink, CsvSink, SheetSink
+from QRStream import StreamAssembler, is_stream_frame
+
+# Frames of video handed to one worker at a time
+VIDEO_SEGMENT_FRAMES = 300
+# Images handed to one worker at a time
+IMAGE_CHUNK = 16
+
+
+# Add the payloads of every code in the frame, keeping first-seen order
+def _collect(frame, payloads, found):
+    for code in pyzbar.decode(to_gray(frame)):
+        if code.data not in found:
+            found.add(code.data)
+            payloads.append(code.data)
+
+
+def _decode_video_segment(path, start, end, step):
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    payloads, found = [], set()
+    frames = 0
+    for index in range(start, end):
+        if (index - start) % step:
+            # grab() skips the cost of decoding frames we are not going to look at
+            if not cap.grab():
+                break
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        _collect(frame, payloads, found)
+    cap.release()
+    return frames, payloads
+
+
+def _decode_images(paths):
+    payloads, found = [], set()
+    frames = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        frames += 1
+        _collect(frame, payloads, found)
+    return frames, payloads
+
+
+# Pool entry point; a task is ("video", path, start, end, step) or ("images", paths)
+def run_task(task):
+    if task[0] == "video":
+        return _decode_video_segment(*task[1:])
+    return _decode_images(task[1])
+
+
+# Split the inputs into pool tasks; returns (tasks, seconds of video covered)
+def build_tasks(inputs, step=1):
+    tasks = []
+    video_seconds = 0.0
+    images = []
+    for path in inputs:
+        if os.path.isdir(path):
+            images += list_images(path)
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            images.append(path)
+        else:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0
+            cap.release()
+            if total <= 0:
+                print(f"Could not read video: {path}")
+                continue
+            if fps:
+                video_seconds += total / fps
+            for start in range(0, total, VIDEO_SEGMENT_FRAMES):
+                tasks.append(("video", path, start, min(total, start + VIDEO_SEGMENT_FRAMES), step))
+    for start in range(0, len(images), IMAGE_CHUNK):
+        tasks.append(("images", images[start:start + IMAGE_CHUNK]))
+    return tasks, video_seconds
+
+
+# Decode every frame of the inputs across a process pool, dedup globally and stream
+# each new record to the sinks as soon as its task finishes.
+def ingest(inputs, sinks, workers=None, step=1, seen_path=None, verbose=True):
+    started = time.perf_counter()
+    tasks, video_seconds = build_tasks(inputs, max(1, step))
+    seen = DedupIndex(seen_path)
+    # A key is stored only once every sink has the record, so a failed write or a
+    # crash leaves it to be taken in again (also by the live scanner sharing `seen`).
+    # A SheetSink holds rows until its batch is sent; its keys are stored from on_sent.
+    buffered = [sink for sink in sinks if isinstance(sink, SheetSink)]
+    # Buffering sinks last, so a batch only goes out once the other sinks have its records
+    sinks = [sink for sink in sinks if sink not in buffered] + buffered
+    taken = set()  # keys written this run, stored or still waiting on a batch
+
+    def confirm(records):
+        for data in records:
+            seen.add(record_key(data))
+    for sink in buffered:
+        sink.on_sent = confirm
+    streams = StreamAssembler()
+    stats = {"tasks": len(tasks), "frames": 0, "records": 0, "duplicates": 0, "errors": 0}
+    with multiprocessing.Pool(workers) as pool:
+        for frames, payloads in pool.imap_unordered(run_task, tasks):
+            stats["frames"] += frames
+            for raw in payloads:
+                try:
+                    if is_stream_frame(raw):
+                        # Frames of a multi-match export may be spread over several tasks
+                        records = streams.add(raw)[3] or []
+                    else:
+                        records = [parse_payload(raw)]
+                except Exception as e:
+                    stats["errors"] += 1
+                    if verbose:
+                        print("Error decoding QR code data:", e)
+                    continue
+                for data in records:
+                    key = record_key(data)
+                    if key in seen or key in taken:
+                        stats["duplicates"] += 1
+                        continue
+                    for sink in sinks:
+                        sink.write(data)
+                    taken.add(key)
+                    stats["records"] += 1
+                    if not buffered:
+                        seen.add(key)
+    for sink in sinks:
+        sink.close()
+    seen.close()
+    stats["seconds"] = time.perf_counter() - started
+    stats["fps"] = stats["frames"] / stats["seconds"] if stats["seconds"] else 0.0
+    if video_seconds:
+        stats["realtime_factor"] = video_seconds / stats["seconds"]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest QR codes from recorded videos and photo folders.")
+    parser.add_argument("inputs", nargs="+", help="video files, image files or folders of images")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--step", type=int, default=1, help="only decode every Nth video frame")
+    parser.add_argument("--output", help="append new records to this JSON-lines file")
+    parser.add_argument("--csv", help="append new records as sheet-layout rows to this CSV file")
+    parser.add_argument("--sheets", action="store_true", help="upload new records to the Google sheet")
+    parser.add_argument("--seen", help="key store shared with the live scanner, e.g. scanned_keys.jsonl")
+    args = parser.parse_args()
+
+    sinks = []
+    if args.output:
+        sinks.append(JsonLinesSink(args.output))
+    if args.csv:
+        sinks.append(CsvSink(args.csv))
+    if args.sheets:
+        uploader = SheetUploader(GspreadSheet(SPREADSHEET_ID, SHEET_NAME, CREDENTIALS_PATH),
+                                 batch_size=UPLOAD_BATCH_SIZE, upsert=True)
+        sinks.append(SheetSink(uploader))
+    if not sinks:
+        print("No --output, --csv or --sheets given; records will only be counted.")
+    stats = ingest(args.inputs, sinks, workers=args.workers, step=args.step, seen_path=args.seen)
+    print(f"{stats['records']} new records, {stats['duplicates']} duplicates, {stats['errors']} errors "
+          f"from {stats['frames']} frames in {stats['seconds']:.1f}s ({stats['fps']:.0f} frames/s)")
+    if "realtime_factor" in stats:
+        print(f"Processed video {stats['realtime_factor']:.1f}x faster than real time")
+
+
+if __name__ == "__main__":
+    main()
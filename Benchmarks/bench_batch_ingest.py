@@ -0,0 +1,52 @@
+import argparse
+import os
+import tempfile
+import time
+import synthetic
+import cv2
+import numpy as np
+from BatchIngest import ingest
+
+# Generate QR images (and optionally a video holding each code for a few frames),
+# then time batch ingestion with 1 worker and with every core.
+
+
+def write_video(image_paths, path, hold_frames=10, size=(1280, 720), fps=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for image_path in image_paths:
+        code = cv2.imread(image_path)
+        frame = np.full((size[1], size[0], 3), 255, dtype=np.uint8)
+        h, w = code.shape[:2]
+        top, left = (size[1] - h) // 2, (size[0] - w) // 2
+        frame[top:top + h, left:left + w] = code
+        for _ in range(hold_frames):
+            writer.write(frame)
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BatchIngest on generated QR codes.")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--video", action="store_true", help="also benchmark a generated video")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        started = time.perf_counter()
+        paths = synthetic.write_qr_images(synthetic.make_records(args.count), os.path.join(folder, "images"))
+        print(f"Generated {len(paths)} QR images in {time.perf_counter() - started:.1f}s")
+        inputs = [os.path.join(folder, "images")]
+        if args.video:
+            video = os.path.join(folder, "codes.avi")
+            write_video(paths, video)
+            inputs = [video]
+        for workers in sorted({1, os.cpu_count() or 1}):
+            stats = ingest(inputs, [], workers=workers, verbose=False)
+            line = (f"workers={workers:<3} frames={stats['frames']:<6} records={stats['records']:<5} "
+                    f"{stats['seconds']:.2f}s {stats['fps']:.0f} frames/s")
+            if "realtime_factor" in stats:
+                line += f" {stats['realtime_factor']:.1f}x real time"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
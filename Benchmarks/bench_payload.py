@@ -0,0 +1,53 @@
+import argparse
+import json
+import statistics
+import time
+import synthetic
+import numpy as np
+from pyzbar import pyzbar
+from Payload import encode_payload, decode_payload
+from QRRender import make_qr_image
+
+# Compare legacy JSON QR payloads against the compact formats: payload size, QR
+# version, and time to generate and to decode the code.
+
+FORMATS = {
+    "json": json.dumps,
+    "compact": lambda record: encode_payload(record, compress=False),
+    "compact+zlib": encode_payload,
+}
+
+
+# Rendered the way the app does; a QR code of version v is 4v + 17 modules wide
+def generate(payload):
+    img = make_qr_image(payload)
+    return (img.width - 17) // 4, img
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QR payload formats.")
+    parser.add_argument("--count", type=int, default=100)
+    args = parser.parse_args()
+    records = synthetic.make_records(args.count)
+
+    print(f"{'format':<14}{'bytes':>8}{'version':>9}{'gen ms':>9}{'decode ms':>11}")
+    for name, encode in FORMATS.items():
+        sizes, versions, gen_times, decode_times = [], [], [], []
+        for record in records:
+            payload = encode(record)
+            sizes.append(len(payload.encode("utf-8")))
+            started = time.perf_counter()
+            version, img = generate(payload)
+            gen_times.append(time.perf_counter() - started)
+            versions.append(version)
+            pixels = np.array(img.get_image().convert("L"))
+            started = time.perf_counter()
+            codes = pyzbar.decode(pixels)
+            assert decode_payload(codes[0].data) == decode_payload(payload)
+            decode_times.append(time.perf_counter() - started)
+        print(f"{name:<14}{statistics.mean(sizes):>8.0f}{statistics.mean(versions):>9.1f}"
+              f"{statistics.mean(gen_times) * 1000:>9.2f}{statistics.mean(decode_times) * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
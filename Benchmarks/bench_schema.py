@@ -0,0 +1,63 @@
+import argparse
+import time
+import synthetic
+from Schema import encode_row, encode_rows, encode_columns
+
+# Throughput of the shared row encoder against the hand-written per-column .get()
+# flattening it replaced.
+
+
+def handwritten_flatten(data):
+    auto = data.get("auto", {})
+    auto_counters = auto.get("counters", {})
+    teleop = data.get("teleop", {})
+    teleop_counters = teleop.get("counters", {})
+    row = [data.get("match_number", ""), data.get("team_number", ""),
+           data.get("selected_color", ""), data.get("scouter_name", "")]
+    for key in synthetic.COUNTER_KEYS:
+        row.append(auto_counters.get(key, 0))
+    row.append(auto.get("moved_state", ""))
+    coords = auto.get("robot_coords")
+    row.append(",".join(map(str, coords)) if coords else "")
+    row.append(auto.get("comment", ""))
+    for key in synthetic.COUNTER_KEYS:
+        row.append(teleop_counters.get(key, 0))
+    row += [teleop.get("climb_state", ""), teleop.get("teleop_broken_state", ""), teleop.get("comment", "")]
+    return row
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the schema row encoder.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    records = synthetic.make_records(args.count)
+    assert [handwritten_flatten(r) for r in records[:100]] == encode_rows(records[:100])
+
+    cases = {
+        "handwritten per record": lambda: [handwritten_flatten(r) for r in records],
+        "encode_row per record": lambda: [encode_row(r) for r in records],
+        "encode_rows batch": lambda: encode_rows(records),
+        "encode_columns (lists)": lambda: encode_columns(records, use_numpy=False),
+    }
+    try:
+        import numpy  # noqa: F401
+        cases["encode_columns (numpy)"] = lambda: encode_columns(records)
+    except ImportError:
+        pass
+    for name, fn in cases.items():
+        seconds = best_of(fn, args.repeat)
+        print(f"{name:<26}{seconds * 1000:>9.1f} ms{args.count / seconds:>12.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Cold-start time of the scouting app. Each run launches App.py in a fresh
+# interpreter with BUBBLES_STARTUP_PROBE set; the app prints how long it took to
+# reach its first idle main-loop turn (window up, match list usable) and quits.
+# With --importtime the runs use `python -X importtime` and the slowest imports are
+# listed. Needs a display, like the app itself.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "App.py")
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run_once(importtime):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [APP]
+    env = dict(os.environ, BUBBLES_STARTUP_PROBE="1")
+    started = time.perf_counter()
+    result = subprocess.run(command, env=env, capture_output=True, text=True, timeout=120)
+    wall = time.perf_counter() - started
+    match = re.search(r"startup_seconds (\S+)", result.stdout)
+    if not match:
+        raise RuntimeError(f"App did not report its startup time:\n{result.stderr[-2000:]}")
+    return float(match.group(1)), wall, result.stderr
+
+
+# Top-level imports (no indentation in the importtime tree) by cumulative time
+def slowest_imports(stderr, top):
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports.append((int(match.group(2)), match.group(4)))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's time to first interactive frame.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    in_app, wall = [], []
+    stderr = ""
+    for _ in range(args.runs):
+        seconds, total, stderr = run_once(args.importtime)
+        in_app.append(seconds)
+        wall.append(total)
+
+    print(f"{'':<26}{'median':>9}{'min':>9}{'max':>9}")
+    for name, values in (("App.py to first idle (s)", in_app), ("process launch to exit (s)", wall)):
+        print(f"{name:<26}{statistics.median(values):>9.3f}{min(values):>9.3f}{max(values):>9.3f}")
+    if args.importtime:
+        print(f"\n{'cumulative ms':>14}  module")
+        for micros, module in slowest_imports(stderr, args.top):
+            print(f"{micros / 1000:>14.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
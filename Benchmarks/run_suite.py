@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import synthetic
+
+# Offline benchmark suite for the scan-to-sheet hot path. Every case runs on
+# synthetic match records (and QR frames rendered from them), is timed best-of
+# --repeat, and is written to a JSON results file. Given a baseline written earlier
+# with --save-baseline on the same machine, any case whose time per item grew by
+# more than --tolerance is reported and the suite exits with status 1.
+#
+# Cases that need a missing optional package (qrcode, cv2, pyzbar, numpy) are
+# recorded as skipped rather than failing the run.
+#
+# --scan-log adds a live scanning session to the report: the last snapshot of a
+# scan_metrics.jsonl written by the scanner becomes one "scan_<stage>" result per
+# stage (mean time per frame or record), compared against the baseline like the rest.
+
+SIZES = [10, 100, 10000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_OUTPUT = "bench_results.json"
+DEFAULT_TOLERANCE = 0.25
+FRAME_COUNT = 20
+CODES_PER_FRAME = 3
+MIN_SAMPLE = 0.05
+
+CASES = []
+
+
+# Register a case: setup(records) prepares data and returns the function to time.
+# `max_size` keeps slow cases (QR rendering) to the smaller sizes.
+def case(name, sizes=SIZES, max_size=None):
+    def register(setup):
+        for size in sizes:
+            if max_size is None or size <= max_size:
+                CASES.append((f"{name}/{size}", size, setup))
+        return setup
+    return register
+
+
+@case("payload_encode")
+def payload_encode(records):
+    from Payload import encode_payload
+    return lambda: [encode_payload(r) for r in records]
+
+
+@case("payload_decode")
+def payload_decode(records):
+    from Payload import encode_payload, decode_payload
+    payloads = [encode_payload(r) for r in records]
+    return lambda: [decode_payload(p) for p in payloads]
+
+
+# What the scanner does per decoded code: parse the payload and drop repeats
+@case("parse_dedup")
+def parse_dedup(records):
+    from DataReader import parse_payload, record_key
+    from Payload import encode_payload
+    from DedupIndex import DedupIndex
+    # Every code is seen twice, as when a QR code stays in view for several frames
+    raw = [encode_payload(r).encode("utf-8") for r in records] * 2
+
+    def run():
+        seen = DedupIndex()
+        for data in raw:
+            seen.add(record_key(parse_payload(data)))
+    return run
+
+
+# Row flattening shared by the app and the scanner
+@case("encode_rows")
+def encode_rows_case(records):
+    from Schema import encode_rows
+    return lambda: encode_rows(records)
+
+
+# Saving matches one at a time, as App.update_match_data does
+@case("save_match_store")
+def save_match_store(records):
+    from MatchStore import MatchStore
+    # Removed once the case is done with run and the directory is garbage collected
+    folder = tempfile.TemporaryDirectory()
+
+    def run():
+        path = os.path.join(folder.name, "bench.journal")
+        if os.path.exists(path):
+            os.remove(path)
+        store = MatchStore(path, compact_after=len(records) + 1)
+        for i, record in enumerate(records):
+            store[f"Match {i}"] = record
+        store.close()
+    return run
+
+
+@case("qr_render", max_size=100)
+def qr_render(records):
+    from Payload import encode_payload
+    payloads = [encode_payload(r) for r in records]
+    synthetic.render_qr(payloads[0])
+    return lambda: [synthetic.render_qr(p) for p in payloads]
+
+
+def _frames():
+    from Payload import encode_payload
+    payloads = [encode_payload(r) for r in synthetic.make_records(FRAME_COUNT * CODES_PER_FRAME, seed=99)]
+    return synthetic.make_frames(payloads, FRAME_COUNT, codes_per_frame=CODES_PER_FRAME)
+
+
+@case("pyzbar_decode_frame", sizes=[FRAME_COUNT])
+def pyzbar_decode_frame(records):
+    from pyzbar import pyzbar
+    frames = [frame for frame, _ in _frames()]
+    return lambda: [pyzbar.decode(frame) for frame in frames]
+
+
+@case("opencv_decode_frame", sizes=[FRAME_COUNT])
+def opencv_decode_frame(records):
+    from Decoders import OpenCVDecoder
+    decode = OpenCVDecoder()
+    frames = [frame for frame, _ in _frames()]
+    return lambda: [decode(frame) for frame in frames]
+
+
+@case("cascade_decode_frame", sizes=[FRAME_COUNT])
+def cascade_decode_frame(records):
+    from pyzbar import pyzbar
+    from DecodeCascade import DecodeCascade
+    frames = [frame for frame, _ in _frames()]
+
+    def run():
+        # decode is passed so a missing pyzbar is reported by setup, not mid-timing
+        cascade = DecodeCascade(decode=pyzbar.decode)
+        return [cascade(frame) for frame in frames]
+    return run
+
+
+# Best time of one call; quick cases are looped (like timeit's autorange) so each
+# sample lasts at least MIN_SAMPLE seconds and small sizes are not all timer noise
+def best_of(fn, repeat):
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_SAMPLE or loops >= 10000:
+            break
+        loops *= 10
+    times = [elapsed]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append(time.perf_counter() - started)
+    return min(times) / loops
+
+
+def run_cases(selected, repeat):
+    results = {}
+    records_cache = {}
+    for name, size, setup in CASES:
+        if selected and not any(name.startswith(s) for s in selected):
+            continue
+        if size not in records_cache:
+            records_cache[size] = synthetic.make_records(size)
+        try:
+            fn = setup(records_cache[size])
+        except ImportError as e:
+            results[name] = {"skipped": f"missing dependency: {e.name or e}"}
+            print(f"{name:<28}skipped ({results[name]['skipped']})")
+            continue
+        seconds = best_of(fn, repeat)
+        results[name] = {"items": size, "seconds": seconds, "us_per_item": seconds / size * 1e6}
+        print(f"{name:<28}{seconds * 1000:>11.2f} ms{results[name]['us_per_item']:>12.1f} us/item")
+    return results
+
+
+# Stage timings from the last snapshot of a ScanMetrics log, as suite results
+def scan_log_results(path):
+    from ScanMetrics import read_log
+    snapshots = read_log(path)
+    if not snapshots:
+        print(f"No snapshots in {path}")
+        return {}
+    last = snapshots[-1]
+    results = {}
+    for stage, summary in last["stages"].items():
+        if summary["count"]:
+            results[f"scan_{stage}"] = {"items": summary["count"], "seconds": summary["mean_ms"] / 1000,
+                                        "us_per_item": summary["mean_ms"] * 1000,
+                                        "p90_ms": summary["p90_ms"], "source": path}
+            print(f"{'scan_' + stage:<28}{summary['mean_ms']:>11.2f} ms  p90 {summary['p90_ms']:.2f} ms")
+    print(f"scan log {path}: {last['fps']:.1f} fps over the last window")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=synthetic.ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# Cases slower than the baseline by more than `tolerance`, as (name, baseline us, now us)
+def regressions(results, baseline, tolerance):
+    slower = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name, {})
+        if "us_per_item" in result and "us_per_item" in before:
+            if result["us_per_item"] > before["us_per_item"] * (1 + tolerance):
+                slower.append((name, before["us_per_item"], result["us_per_item"]))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline scan-to-sheet benchmark suite.")
+    parser.add_argument("cases", nargs="*", help="only run cases whose name starts with one of these")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown per item before a case counts as a regression")
+    parser.add_argument("--scan-log", help="also report the stage timings of a scanner metrics log")
+    args = parser.parse_args()
+
+    results = run_cases(args.cases, args.repeat)
+    if args.scan_log:
+        results.update(scan_log_results(args.scan_log))
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    slower = regressions(results, baseline, args.tolerance)
+    for name, before, now in slower:
+        print(f"REGRESSION {name}: {before:.1f} -> {now:.1f} us/item ({now / before - 1:+.0%})")
+    if slower:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
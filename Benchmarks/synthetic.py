@@ -0,0 +1,87 @@
+import json
+import os
+import random
+import sys
+
+# Let benchmark scripts import the app modules from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from Schema import COUNTER_KEYS  # noqa: E402
+
+CLIMB_STATES = ["DEEP", "SHALLOW", "PARK", "NONE", "No barge"]
+SCOUTS = ["Alex", "Sam", "Jordan", "Riley", "Casey", "Morgan"]
+
+
+# A match record shaped like the one App.update_last_data_str serializes
+def make_record(i, rng):
+    x = float(rng.randint(0, 500))
+    y = float(rng.randint(0, 300))
+    return {
+        "match_number": f"Match {i // 6 + 1}",
+        "team_number": str(rng.randint(1, 9999)),
+        "selected_color": "Red" if i % 6 < 3 else "Blue",
+        "scouter_name": SCOUTS[i % 6],
+        "auto": {"counters": {k: rng.randint(0, 3) for k in COUNTER_KEYS},
+                 "moved_state": rng.choice(["Yes", "No"]),
+                 "robot_coords": [x, y, x + 40.0, y + 40.0],
+                 "climb_state": "N/A",
+                 "comment": rng.choice(["", "fast auto", "missed L4 twice"])},
+        "teleop": {"counters": {k: rng.randint(0, 12) for k in COUNTER_KEYS},
+                   "climb_state": rng.choice(CLIMB_STATES),
+                   "teleop_broken_state": rng.choice(["Yes", "No"]),
+                   "comment": rng.choice(["", "good defense", "tipped near the barge"])},
+    }
+
+
+def make_records(count, seed=1234):
+    rng = random.Random(seed)
+    return [make_record(i, rng) for i in range(count)]
+
+
+# Render a payload the way the app does
+def render_qr(data_str):
+    from QRRender import make_qr_image
+    return make_qr_image(data_str).get_image().convert("RGB")
+
+
+def write_qr_images(records, folder):
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i, record in enumerate(records):
+        path = os.path.join(folder, f"qr_{i:05d}.png")
+        render_qr(json.dumps(record)).save(path)
+        paths.append(path)
+    return paths
+
+
+# Camera-like frames: several QR codes per frame at random sizes and positions on a
+# grey background, then blurred and overlaid with sensor noise. Returns a list of
+# (BGR frame, payloads shown in it).
+def make_frames(payloads, count, codes_per_frame=3, size=(1280, 720), noise=8.0, blur=3, seed=1234):
+    import cv2
+    import numpy as np
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    codes = [np.array(render_qr(p))[:, :, ::-1] for p in payloads]
+    width, height = size
+    cell_w = width // codes_per_frame
+    frames = []
+    for f in range(count):
+        frame = np.full((height, width, 3), rng.randint(150, 220), dtype=np.uint8)
+        shown = []
+        for slot in range(codes_per_frame):
+            index = (f * codes_per_frame + slot) % len(codes)
+            side = min(cell_w - 20, height - 20, rng.randint(220, 420))
+            code = cv2.resize(codes[index], (side, side), interpolation=cv2.INTER_AREA)
+            left = slot * cell_w + rng.randint(0, cell_w - side)
+            top = rng.randint(0, height - side)
+            frame[top:top + side, left:left + side] = code
+            shown.append(payloads[index])
+        if blur:
+            frame = cv2.GaussianBlur(frame, (blur | 1, blur | 1), 0)
+        if noise:
+            frame = np.clip(frame + np_rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+        frames.append((frame, shown))
+    return frames
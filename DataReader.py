@@ -1,127 +1,336 @@
+import argparse
+import contextlib
+import os
+import sys
+import threading
+import time
 import cv2
 import json
-from pyzbar import pyzbar
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from collections import Counter
+from SheetUploader import GspreadSheet
+from UploadOutbox import UploadOutbox
+from DedupIndex import DedupIndex
+from ScannerPipeline import ScannerPipeline, FrameListSource, ThrottledSource
+from DecodeCascade import DecodeCascade
+from Decoders import BACKEND_NAMES, choose_decoders
+from Payload import decode_payload
+from QRStream import StreamAssembler, is_stream_frame
+from Sinks import JsonLinesSink, CsvSink, SqliteSink, OutboxSink
+from ScanMetrics import ScanMetrics
 
 # Provided credentials
 SPREADSHEET_ID = "12PUHwWSQQou5LjnwuTT-mEWn5Z42Ixny6Z-MZ8DhpDY"
 SHEET_NAME = "Raw"
 CREDENTIALS_PATH = "bubblescout-07b081651c6e.json"
+UPLOAD_BATCH_SIZE = 100
+# Keys of every record already ingested, kept across scanner restarts
+SEEN_KEYS_PATH = "scanned_keys.jsonl"
+# Local copy of every scanned entry in the sheet's column layout
+SCANNED_CSV_PATH = "scanned_data.csv"
+# Records waiting to be uploaded to the sheet; survives restarts and lost connections
+SCANNER_OUTBOX_PATH = "scanner_outbox.journal"
+# Decode threads; pyzbar releases the GIL while decoding
+DECODE_WORKERS = 2
+# QR decoder backend: "pyzbar", "opencv", or "auto" to time both at startup and use
+# the fastest reliable one, with the other as a fallback
+DECODER = "auto"
+# Rolling per-stage timings and FPS, appended every second; None turns them off
+SCAN_METRICS_PATH = "scan_metrics.jsonl"
+# Draw FPS and decode/latency percentiles on the preview window
+SHOW_METRICS_OVERLAY = True
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
 
-def flatten_data(data):
-    # Info columns: Match, Team, Alliance, Scout Name
-    info = [
-        data.get("match_number", ""),
-        data.get("team_number", ""),
-        data.get("selected_color", ""),
-        data.get("scouter_name", "")
-    ]
-    # Auto columns: L1, L2, L3, L4, Algae Removed, Algae Processed, Algae Netted, Move State, Starting Pos, Comment
-    auto = data.get("auto", {})
-    auto_counters = auto.get("counters", {})
-    auto_values = [
-        auto_counters.get("L1", 0),
-        auto_counters.get("L2", 0),
-        auto_counters.get("L3", 0),
-        auto_counters.get("L4", 0),
-        auto_counters.get("Algae Removed", 0),
-        auto_counters.get("Algae Processed", 0),
-        auto_counters.get("Algae Netted", 0),
-        auto.get("moved_state", ""),
-        ",".join(map(str, auto.get("robot_coords", []))),
-        auto.get("comment", "")
-    ]
-    # TeleOp columns: L1, L2, L3, L4, Algae Removed, Algae Processed, Algae Netted, Climb State, Broken, Comment
-    teleop = data.get("teleop", {})
-    teleop_counters = teleop.get("counters", {})
-    teleop_values = [
-        teleop_counters.get("L1", 0),
-        teleop_counters.get("L2", 0),
-        teleop_counters.get("L3", 0),
-        teleop_counters.get("L4", 0),
-        teleop_counters.get("Algae Removed", 0),
-        teleop_counters.get("Algae Processed", 0),
-        teleop_counters.get("Algae Netted", 0),
-        teleop.get("climb_state", ""),
-        teleop.get("teleop_broken_state", ""),
-        teleop.get("comment", "")
-    ]
-    return info + auto_values + teleop_values
-
-def update_google_sheet(json_data):
-    # Authenticate and open the spreadsheet
-    scope = ['https://www.googleapis.com/auth/spreadsheets',
-             'https://www.googleapis.com/auth/drive']
-    creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_PATH, scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open_by_key(SPREADSHEET_ID)
+# Parse the raw bytes of a QR code (legacy JSON or compact format) into a match record
+def parse_payload(raw):
+    return decode_payload(raw.decode("utf-8"))
+
+# Unique identity of a scanned record
+def record_key(data):
+    return (data.get("scouter_name", ""), data.get("match_number", ""), data.get("team_number", ""))
+
+def list_images(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+# Frame source for a camera index, a video file, an image or a folder of images.
+# Resolution and FPS are requested from cameras; `fps` also caps how fast any source
+# is read, so a recording replays at camera speed instead of as fast as it decodes.
+def open_source(spec=0, width=None, height=None, fps=None):
+    if isinstance(spec, int) or str(spec).isdigit():
+        source = cv2.VideoCapture(int(spec))
+        if width:
+            source.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            source.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            source.set(cv2.CAP_PROP_FPS, fps)
+    elif os.path.isdir(spec):
+        return FrameListSource(list_images(spec), fps=fps, load=cv2.imread)
+    elif spec.lower().endswith(IMAGE_EXTENSIONS):
+        return FrameListSource([spec], fps=fps, load=cv2.imread)
+    else:
+        source = cv2.VideoCapture(spec)
+    if not source.isOpened():
+        raise OSError(f"Could not open video source {spec!r}")
+    return ThrottledSource(source, fps) if fps else source
+
+def show_frame(frame, codes, status_lines=(), window="QR Code Scanner"):
+    # Display the frame with bounding boxes; returns False once 'q' is pressed
+    frame = frame.copy()
+    for code in codes:
+        (x, y, w, h) = code.rect
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+    for i, line in enumerate(status_lines):
+        cv2.putText(frame, line, (10, 30 + 30 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 200, 255), 2)
+    cv2.imshow(window, frame)
+    return cv2.waitKey(1) & 0xFF != ord("q")
+
+# Turns decoded codes into new records. Codes from every camera pass through one lock,
+# so the dedup index, multi-frame stream assembly and sinks see a single stream of
+# records, and each record is counted against the camera that read it.
+class RecordCollector:
+    def __init__(self, seen, sinks=(), metrics=None):
+        self.seen = seen
+        self.sinks = list(sinks)
+        self.metrics = metrics
+        self.records = []
+        self.streams = StreamAssembler()
+        self.status = {}         # stream id -> progress text drawn on the preview
+        self.camera_counts = {}  # camera -> Counter of codes, new, duplicate, malformed, failed
+        self.delivered = {}      # key -> indexes of the sinks that have a record some other sink failed on
+        self.lock = threading.Lock()
+
+    def _count(self, camera, name):
+        self.camera_counts[camera][name] += 1
+        if self.metrics is not None:
+            self.metrics.count(name)
+
+    def add_entry(self, data, camera):
+        # Create a unique key based on (scouter_name, match_number, team_number)
+        key = record_key(data)
+        if key in self.seen:
+            self._count(camera, "duplicate")
+            print("Duplicate entry found; ignoring.")
+            return
+        # The key is only stored once every sink has the record, so a record a sink
+        # failed on is taken in again the next time it is scanned; sinks that already
+        # have it are not written twice
+        metrics = self.metrics
+        done = self.delivered.setdefault(key, set())
+        try:
+            if metrics is not None:
+                started = metrics.clock()
+            for i, sink in enumerate(self.sinks):
+                if i not in done:
+                    sink.write(data)
+                    done.add(i)
+            if metrics is not None:
+                metrics.stage("sink", metrics.clock() - started)
+        except Exception as e:
+            self._count(camera, "failed")
+            print(f"Could not save entry from {camera}; it will be taken in when scanned again:", e)
+            return
+        del self.delivered[key]
+        self.seen.add(key)
+        self.records.append(data)
+        self._count(camera, "new")
+        print(f"New entry added from {camera}:")
+        print(json.dumps(data, indent=4))
+
+    def add_stream_frame(self, raw, camera):
+        stream_id, known, total, records = self.streams.add(raw)
+        text = f"Stream {stream_id:04X}: {known}/{total} blocks"
+        if self.status.get(stream_id) != text:
+            self.status[stream_id] = text
+            print(text)
+        if records is not None:
+            print(f"Stream {stream_id:04X} complete with {len(records)} matches.")
+            for data in records:
+                self.add_entry(data, camera)
+
+    def on_codes(self, codes, camera):
+        with self.lock:
+            self.camera_counts.setdefault(camera, Counter())["codes"] += len(codes)
+            for code in codes:
+                try:
+                    if is_stream_frame(code.data):
+                        self.add_stream_frame(code.data, camera)
+                    else:
+                        if self.metrics is not None:
+                            started = self.metrics.clock()
+                        data = parse_payload(code.data)
+                        if self.metrics is not None:
+                            self.metrics.stage("parse", self.metrics.clock() - started)
+                        self.add_entry(data, camera)
+                except Exception as e:
+                    self._count(camera, "malformed")
+                    print("Error decoding QR code data:", e)
+
+    # on_codes callback for one camera's pipeline
+    def handler(self, camera):
+        self.camera_counts.setdefault(camera, Counter())
+        return lambda codes: self.on_codes(codes, camera)
+
+def print_camera_stats(names, pipelines, collector, seconds):
+    print(f"{'camera':<16}{'frames':>8}{'fps':>7}{'dropped':>9}{'codes':>7}{'new':>6}{'dup':>6}{'bad':>6}"
+          f"{'failed':>8}")
+    for name, pipeline in zip(names, pipelines):
+        counts = collector.camera_counts[name]
+        fps = pipeline.frames_decoded / seconds if seconds else 0.0
+        print(f"{name:<16}{pipeline.frames_read:>8}{fps:>7.1f}{pipeline.frames_dropped:>9}{counts['codes']:>7}"
+              f"{counts['new']:>6}{counts['duplicate']:>6}{counts['malformed']:>6}{counts['failed']:>8}")
+
+# Scan several cameras (or any read()/release() sources) at once. Each source gets
+# its own capture/decode pipeline on a thread of its own; all of them feed one
+# RecordCollector, so a record shown to two cameras is still taken in once. Preview
+# windows are drawn from this thread, since GUI calls must stay on one thread.
+def read_qr_codes_from_cameras(sources, seen_path=SEEN_KEYS_PATH, headless=False, workers=DECODE_WORKERS,
+                               drop_frames=True, metrics=None, overlay=SHOW_METRICS_OVERLAY, sinks=(),
+                               names=None, decoder=DECODER):
+    decode, fallback = choose_decoders(decoder)
+    print(f"Decoding with {decode.name}" + (f", falling back to {fallback.name}." if fallback else "."))
+    seen = DedupIndex(seen_path)
+    if len(seen):
+        print(f"Loaded {len(seen)} previously scanned entries.")
+    collector = RecordCollector(seen, sinks, metrics)
+    names = list(names) if names else [f"Camera {i}" for i in range(len(sources))]
+    # Stats are kept per name, so sources sharing one (two folders both called
+    # "imgs") are told apart by their position
+    if len(set(names)) < len(names):
+        names = [f"{name} #{i}" for i, name in enumerate(names)]
+    windows = ["QR Code Scanner"] if len(sources) == 1 else [f"QR Code Scanner - {n}" for n in names]
+    # Cheap downscaled pass first, full resolution only around recently seen codes.
+    # Tracked boxes belong to one camera's view, so every camera has its own cascade.
+    cascades = [DecodeCascade(decode, fallback=fallback) for _ in sources]
+    pipelines = [ScannerPipeline(source, cascade, collector.handler(name), workers=workers,
+                                 drop_frames=drop_frames, metrics=metrics)
+                 for source, cascade, name in zip(sources, cascades, names)]
+    threads = [threading.Thread(target=pipeline.run, name=f"scanner-{name}", daemon=True)
+               for pipeline, name in zip(pipelines, names)]
+    print("Starting QR code scanning. Press Ctrl+C to stop." if headless
+          else "Starting QR code scanning. Press 'q' to quit.")
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
     try:
-        sheet = spreadsheet.worksheet(SHEET_NAME)
-    except gspread.exceptions.WorksheetNotFound:
-        sheet = spreadsheet.add_worksheet(title=SHEET_NAME, rows="100", cols="26")
-    # If the sheet is empty, add headers in two rows
-    if not sheet.row_values(1):
-        header_row1 = ["Info", "", "", "", "Auto", "", "", "", "", "", "", "", "", "", "TeleOp", "", "", "", "", "", "", "", "", "", ""]
-        header_row2 = ["Match", "Team", "Alliance", "Scout Name",
-                       "L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted", "Move State",
-                       "Starting Pos", "Comment",
-                       "L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted", "Climb State",
-                       "Broken", "Comment"]
-        sheet.update("A1:X2", [header_row1, header_row2])
-    # Flatten the data in the correct order
-    flattened = flatten_data(json_data)
-    sheet.append_row(flattened, value_input_option="USER_ENTERED")
-    print("Data sent to Google Sheets successfully.")
-
-def read_qr_codes_from_camera():
-    temp_data = []  # Temporary storage for unique entries
-    cap = cv2.VideoCapture(0)  # Open default camera
-    print("Starting QR code scanning. Press 'q' to quit.")
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to grab frame.")
-            break
-
-        # Decode all QR codes in the frame
-        codes = pyzbar.decode(frame)
-        # Sort codes left to right based on x coordinate
-        codes = sorted(codes, key=lambda c: c.rect.left)
-
-        for code in codes:
-            data_str = code.data.decode("utf-8")
-            try:
-                data = json.loads(data_str)
-                # Create a unique key based on (scouter_name, match_number, team_number)
-                key = (data.get("scouter_name", ""), data.get("match_number", ""), data.get("team_number", ""))
-                keys_existing = [(d.get("scouter_name", ""), d.get("match_number", ""), d.get("team_number", "")) for d in temp_data]
-                if key not in keys_existing:
-                    temp_data.append(data)
-                    print("New entry added:")
-                    print(json.dumps(data, indent=4))
-                else:
-                    print("Duplicate entry found; ignoring.")
-            except Exception as e:
-                print("Error decoding QR code data:", e)
-
-        # Optionally, display the frame with bounding boxes
-        for code in codes:
-            (x, y, w, h) = code.rect
-            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-        cv2.imshow("QR Code Scanner", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
-    return temp_data
+        while any(thread.is_alive() for thread in threads):
+            if headless:
+                threads[0].join(timeout=0.1)
+                continue
+            shown = False
+            for pipeline, window in zip(pipelines, windows):
+                seq, frame, _ = pipeline.latest_frame
+                if seq <= pipeline.last_shown:
+                    continue
+                pipeline.last_shown = seq
+                shown = True
+                lines = list(collector.status.values())
+                if overlay and metrics is not None:
+                    lines = metrics.overlay_lines() + lines
+                if metrics is not None:
+                    display_started = metrics.clock()
+                keep_going = show_frame(frame, pipeline.latest_codes, lines, window)
+                if metrics is not None:
+                    metrics.stage("display", metrics.clock() - display_started)
+                if not keep_going:
+                    raise KeyboardInterrupt
+            if not shown and cv2.waitKey(5) & 0xFF == ord("q"):
+                raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        print("Scanning stopped.")
+    for pipeline in pipelines:
+        pipeline.stop_event.set()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    for name, pipeline in zip(names, pipelines):
+        if pipeline.capture_failed:
+            print(f"{name}: no more frames.")
+    if not headless:
+        cv2.destroyAllWindows()
+    for name, cascade in zip(names, cascades):
+        if len(cascades) > 1:
+            print(f"{name}:")
+        cascade.print_stats()
+    print("Decoder latency:")
+    decode.print_stats("primary")
+    if fallback is not None:
+        fallback.print_stats("fallback")
+    print_camera_stats(names, pipelines, collector, seconds)
+    if metrics is not None:
+        print("\n".join(metrics.overlay_lines()))
+        metrics.close()
+    for sink in collector.sinks:
+        sink.close()
+    seen.close()
+    return collector.records
+
+def read_qr_codes_from_camera(seen_path=SEEN_KEYS_PATH, source=None, headless=False,
+                              workers=DECODE_WORKERS, drop_frames=True, metrics=None,
+                              overlay=SHOW_METRICS_OVERLAY, sinks=(), decoder=DECODER):
+    # Every new entry is written to each sink as soon as it is scanned
+    if source is None:
+        source = cv2.VideoCapture(0)  # Open default camera
+    return read_qr_codes_from_cameras([source], seen_path, headless=headless, workers=workers,
+                                      drop_frames=drop_frames, metrics=metrics, overlay=overlay, sinks=sinks,
+                                      decoder=decoder)
+
+# Records go to the sheet from the outbox's own thread, so scanning never waits on
+# the network and works offline; the connection is only made when uploading
+def make_sheet_sink():
+    outbox = UploadOutbox(SCANNER_OUTBOX_PATH,
+                          lambda: GspreadSheet(SPREADSHEET_ID, SHEET_NAME, CREDENTIALS_PATH),
+                          batch_size=UPLOAD_BATCH_SIZE, uploader_options={"upsert": True})
+    return OutboxSink(outbox, lambda record: json.dumps(record_key(record)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan match QR codes from a camera or recording.")
+    parser.add_argument("--camera", type=int, nargs="+", default=[0],
+                        help="camera indexes; several cameras are scanned at once (default 0)")
+    parser.add_argument("--source", action="append",
+                        help="video file, image or folder of images to scan instead of a camera; repeatable")
+    parser.add_argument("--width", type=int, help="requested camera frame width")
+    parser.add_argument("--height", type=int, help="requested camera frame height")
+    parser.add_argument("--fps", type=float, help="cap on frames read per second")
+    parser.add_argument("--headless", action="store_true", help="no preview window; stop with Ctrl+C")
+    parser.add_argument("--workers", type=int, default=DECODE_WORKERS, help="decode threads")
+    parser.add_argument("--decoder", choices=("auto",) + BACKEND_NAMES, default=DECODER,
+                        help="QR decoder backend; auto picks the fastest reliable one at startup")
+    parser.add_argument("--output", help="append new records as JSON lines to this file ('-' for stdout)")
+    parser.add_argument("--csv", help="append new records as sheet-layout rows to this CSV file")
+    parser.add_argument("--sqlite", help="write new records to this SQLite database")
+    parser.add_argument("--sheets", action="store_true",
+                        help="upload new records to the Google sheet in the background (queued while offline)")
+    parser.add_argument("--seen", default=SEEN_KEYS_PATH, help="key store of records already ingested")
+    parser.add_argument("--metrics", default=SCAN_METRICS_PATH, help="scan metrics log ('' to turn off)")
+    args = parser.parse_args()
+
+    sinks = []
+    if args.output:
+        sinks.append(JsonLinesSink(args.output))
+    if args.csv:
+        sinks.append(CsvSink(args.csv))
+    if args.sqlite:
+        sinks.append(SqliteSink(args.sqlite))
+    if args.sheets:
+        sinks.append(make_sheet_sink())
+    if not sinks:
+        # Same destinations as before there were options: a CSV backup and the sheet,
+        # which is uploaded in the background and retried until the network is back
+        sinks = [CsvSink(SCANNED_CSV_PATH), make_sheet_sink()]
+
+    specs = args.source or args.camera
+    sources = [open_source(spec, args.width, args.height, args.fps) for spec in specs]
+    names = [os.path.basename(os.path.normpath(str(spec))) if args.source else f"Camera {spec}" for spec in specs]
+    metrics = ScanMetrics(args.metrics) if args.metrics else None
+    # Records own stdout when they are streamed there; progress goes to stderr
+    log_to = sys.stderr if args.output == "-" else sys.stdout
+    with contextlib.redirect_stdout(log_to):
+        scanned_data = read_qr_codes_from_cameras(sources, args.seen, headless=args.headless,
+                                                  workers=args.workers, drop_frames=args.source is None,
+                                                  metrics=metrics, sinks=sinks, names=names,
+                                                  decoder=args.decoder)
+        print(f"{len(scanned_data)} new entries scanned.")
 
 if __name__ == "__main__":
-    scanned_data = read_qr_codes_from_camera()
-    print("\nFinal unique QR data:")
-    for entry in scanned_data:
-        print(json.dumps(entry, indent=4))
-        # Send each unique entry to the Google spreadsheet.
-        update_google_sheet(entry)
+    main()
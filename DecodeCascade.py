@@ -0,0 +1,160 @@
+import threading
+import cv2
+
+# Frames wider than this are downscaled for the fast pass
+FAST_MAX_WIDTH = 640
+# Padding (in full-resolution pixels) added around a tracked box before cropping
+ROI_PADDING = 40
+# A box is tracked for this many frames after it was last decoded
+TRACK_FRAMES = 15
+# While nothing is found, run a full-resolution pass every this many frames so small,
+# distant codes are still picked up and start being tracked
+FULL_SCAN_INTERVAL = 5
+
+TIERS = ("fast", "roi", "threshold", "full", "fallback")
+
+
+def to_gray(frame):
+    if frame.ndim == 3:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return frame
+
+
+# Map a code decoded on a scaled/cropped image back to full-frame coordinates
+def _remap(code, scale, dx, dy):
+    left, top, width, height = code.rect
+    rect = code.rect._replace(left=int(left * scale) + dx, top=int(top * scale) + dy,
+                              width=int(width * scale), height=int(height * scale))
+    polygon = [p._replace(x=int(p.x * scale) + dx, y=int(p.y * scale) + dy) for p in code.polygon]
+    return code._replace(rect=rect, polygon=polygon)
+
+
+def _overlaps(a, b):
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+# Tiered decoder used in place of a full-frame pyzbar.decode on every frame:
+#   fast      - grayscale, downscaled whole frame
+#   roi       - full-resolution crops around boxes seen in recent frames that the
+#               fast pass missed
+#   threshold - adaptive-threshold retry of the downscaled frame, only when the
+#               earlier tiers found nothing
+#   full      - periodic full-resolution pass while nothing is being found
+#   fallback  - a second decoder backend (see Decoders) on the full-resolution frame,
+#               at the same periodic misses, for codes the primary cannot read
+# Safe to call from several decode threads at once.
+class DecodeCascade:
+    def __init__(self, decode=None, fast_max_width=FAST_MAX_WIDTH, roi_padding=ROI_PADDING,
+                 track_frames=TRACK_FRAMES, full_scan_interval=FULL_SCAN_INTERVAL, fallback=None):
+        if decode is None:
+            # pyzbar unless another backend is given, so it need not be installed then
+            from pyzbar import pyzbar
+            decode = pyzbar.decode
+        self.decode = decode
+        self.fallback = fallback
+        self.fast_max_width = fast_max_width
+        self.roi_padding = roi_padding
+        self.track_frames = track_frames
+        self.full_scan_interval = full_scan_interval
+        self.lock = threading.Lock()
+        self.frame_count = 0
+        self.misses = 0
+        self.tracks = []  # [(rect, last_seen_frame)]
+        self.attempts = {tier: 0 for tier in TIERS}
+        self.hits = {tier: 0 for tier in TIERS}
+
+    def _count(self, tier, codes):
+        with self.lock:
+            self.attempts[tier] += 1
+            if codes:
+                self.hits[tier] += 1
+
+    def _fast(self, gray):
+        height, width = gray.shape[:2]
+        if width > self.fast_max_width:
+            scale = width / self.fast_max_width
+            small = cv2.resize(gray, (self.fast_max_width, int(height / scale)), interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+            small = gray
+        codes = [_remap(c, scale, 0, 0) for c in self.decode(small)]
+        self._count("fast", codes)
+        return codes, small, scale
+
+    def _roi(self, gray, boxes):
+        height, width = gray.shape[:2]
+        pad = self.roi_padding
+        codes = []
+        seen = set()
+        for left, top, w, h in boxes:
+            x1, y1 = max(0, left - pad), max(0, top - pad)
+            x2, y2 = min(width, left + w + pad), min(height, top + h + pad)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            for code in self.decode(gray[y1:y2, x1:x2]):
+                if code.data not in seen:
+                    seen.add(code.data)
+                    codes.append(_remap(code, 1.0, x1, y1))
+        self._count("roi", codes)
+        return codes
+
+    def _threshold(self, small, scale):
+        binary = cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 5)
+        codes = [_remap(c, scale, 0, 0) for c in self.decode(binary)]
+        self._count("threshold", codes)
+        return codes
+
+    def _full(self, gray):
+        codes = list(self.decode(gray))
+        self._count("full", codes)
+        return codes
+
+    def _fallback(self, gray):
+        codes = list(self.fallback(gray))
+        self._count("fallback", codes)
+        return codes
+
+    def __call__(self, frame):
+        with self.lock:
+            self.frame_count += 1
+            frame_no = self.frame_count
+            self.tracks = [(r, seen) for r, seen in self.tracks if frame_no - seen <= self.track_frames]
+            tracked = [r for r, _ in self.tracks]
+        gray = to_gray(frame)
+        codes, small, scale = self._fast(gray)
+        # Tracked boxes the fast pass did not account for get a full-resolution look
+        missed = [r for r in tracked if not any(_overlaps(r, c.rect) for c in codes)]
+        if missed:
+            found = set(c.data for c in codes)
+            codes += [c for c in self._roi(gray, missed) if c.data not in found]
+        if not codes:
+            codes = self._threshold(small, scale)
+        if not codes:
+            with self.lock:
+                self.misses += 1
+                run_full = self.full_scan_interval and self.misses % self.full_scan_interval == 0
+            if run_full and scale != 1.0:
+                codes = self._full(gray)
+            if run_full and not codes and self.fallback is not None:
+                codes = self._fallback(gray)
+        with self.lock:
+            if codes:
+                self.misses = 0
+                fresh = [tuple(c.rect) for c in codes]
+                self.tracks = [(r, seen) for r, seen in self.tracks
+                               if not any(_overlaps(r, f) for f in fresh)]
+                self.tracks += [(r, frame_no) for r in fresh]
+        # Sort codes left to right based on x coordinate
+        return sorted(codes, key=lambda c: c.rect.left)
+
+    def stats(self):
+        with self.lock:
+            return {tier: {"attempts": self.attempts[tier], "hits": self.hits[tier],
+                           "hit_rate": self.hits[tier] / self.attempts[tier] if self.attempts[tier] else 0.0}
+                    for tier in TIERS}
+
+    def print_stats(self):
+        print("Decode tier hit rates:")
+        for tier, s in self.stats().items():
+            print(f"  {tier:<9} {s['hits']:>6}/{s['attempts']:<6} ({s['hit_rate']:.0%})")
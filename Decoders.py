@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+from collections import namedtuple
+from Payload import BASE45_CHARSET
+from ScanMetrics import percentile
+
+# QR decoder backends for the scanner. Every backend is a callable taking a grayscale
+# or BGR image and returning pyzbar-style results (data bytes, rect, polygon), so
+# DecodeCascade, the preview and the payload parser work the same with any of them.
+#
+# Backends differ by lighting, code density and CPU, so "auto" times each one at
+# startup on synthetic camera-like frames and picks the fastest that reads reliably;
+# the most reliable of the others becomes the fallback, tried only when the primary
+# misses.
+
+BACKEND_NAMES = ("pyzbar", "opencv")
+CALIBRATION_FRAMES = 8
+CALIBRATION_CODES = 2
+# Frames the size DecodeCascade's fast pass decodes
+CALIBRATION_SIZE = (640, 360)
+CALIBRATION_SEED = 4414
+# A backend counts as reliable when it reads at least this share of the codes
+MIN_READ_RATE = 0.9
+
+# Same shapes as pyzbar's results; DecodeCascade rescales them with _replace
+Rect = namedtuple("Rect", "left top width height")
+Point = namedtuple("Point", "x y")
+Decoded = namedtuple("Decoded", "data type rect polygon")
+
+
+# cv2.QRCodeDetector results as pyzbar-style results. A detector keeps state between
+# calls, so each decode thread gets its own.
+class OpenCVDecoder:
+    def __init__(self):
+        import cv2
+        if not hasattr(cv2, "QRCodeDetector") or not hasattr(cv2.QRCodeDetector, "detectAndDecodeMulti"):
+            raise ImportError("OpenCV 4.3 or newer is needed for QRCodeDetector.detectAndDecodeMulti")
+        self.cv2 = cv2
+        self.local = threading.local()
+
+    def __call__(self, image):
+        detector = getattr(self.local, "detector", None)
+        if detector is None:
+            detector = self.local.detector = self.cv2.QRCodeDetector()
+        try:
+            ok, texts, points, _ = detector.detectAndDecodeMulti(image)
+        except self.cv2.error:
+            return []
+        if not ok or points is None:
+            return []
+        codes = []
+        for text, quad in zip(texts, points):
+            # Codes that were found but could not be decoded come back as ""
+            if not text:
+                continue
+            polygon = [Point(int(x), int(y)) for x, y in quad]
+            xs = [p.x for p in polygon]
+            ys = [p.y for p in polygon]
+            rect = Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+            codes.append(Decoded(text.encode("utf-8"), "QRCODE", rect, polygon))
+        return codes
+
+
+# Raises ImportError when the backend's package is not installed
+def load_backend(name):
+    if name == "pyzbar":
+        from pyzbar import pyzbar
+        return pyzbar.decode
+    if name == "opencv":
+        return OpenCVDecoder()
+    raise ValueError(f"Unknown decoder backend {name!r}; choose from {', '.join(BACKEND_NAMES)}")
+
+
+def available_backends(names=BACKEND_NAMES):
+    backends = {}
+    for name in names:
+        try:
+            backends[name] = load_backend(name)
+        except ImportError as e:
+            print(f"Decoder {name} unavailable: {e}")
+    return backends
+
+
+# Wraps a backend to count calls, hits and time spent; safe across decode threads
+class TimedDecoder:
+    def __init__(self, name, decode):
+        self.name = name
+        self.decode = decode
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    def __call__(self, image):
+        started = time.perf_counter()
+        codes = self.decode(image)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.calls += 1
+            self.hits += bool(codes)
+            self.seconds += elapsed
+        return codes
+
+    def print_stats(self, role):
+        with self.lock:
+            mean_ms = self.seconds / self.calls * 1000 if self.calls else 0.0
+            print(f"  {role:<9} {self.name:<8} {self.calls:>7} calls {mean_ms:>7.2f} ms/call "
+                  f"{self.hits:>6} with codes")
+
+
+# Grayscale camera-like frames with a few QR codes each, blurred and noisy.
+# Returns (frame, payloads shown in it). Needs qrcode and numpy.
+def calibration_frames(count=CALIBRATION_FRAMES, codes_per_frame=CALIBRATION_CODES,
+                       size=CALIBRATION_SIZE, seed=CALIBRATION_SEED):
+    import cv2
+    import numpy as np
+    from QRRender import make_qr_image
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    width, height = size
+    cell_w = width // codes_per_frame
+    frames = []
+    for f in range(count):
+        frame = np.full((height, width), rng.randint(150, 220), dtype=np.uint8)
+        shown = []
+        for slot in range(codes_per_frame):
+            # About the length of a compact match payload
+            payload = "".join(rng.choice(BASE45_CHARSET) for _ in range(rng.randint(90, 160)))
+            code = np.array(make_qr_image(payload).get_image().convert("L"))
+            side = min(cell_w - 10, height - 10, rng.randint(height // 3, height - 40))
+            code = cv2.resize(code, (side, side), interpolation=cv2.INTER_AREA)
+            left = slot * cell_w + rng.randint(0, cell_w - side)
+            top = rng.randint(0, height - side)
+            frame[top:top + side, left:left + side] = code
+            shown.append(payload)
+        frame = cv2.GaussianBlur(frame, (3, 3), 0)
+        frame = np.clip(frame + np_rng.normal(0, 6.0, frame.shape), 0, 255).astype(np.uint8)
+        frames.append((frame, shown))
+    return frames
+
+
+# Time every backend on the same frames. `frames` holds (image, expected payloads); with
+# expected None (e.g. frames captured from a camera) a backend's reads are compared
+# with everything any backend read in that frame. Returns (results, primary, fallback):
+# the primary is the fastest backend reading at least `min_read_rate` of the codes,
+# the fallback the best reader among the rest.
+def calibrate(backends, frames, min_read_rate=MIN_READ_RATE):
+    results = {}
+    reads = {}
+    for name, decode in backends.items():
+        # The first call of a backend pays one-off setup; keep it out of the timings
+        decode(frames[0][0])
+        times = []
+        found = []
+        for image, _ in frames:
+            started = time.perf_counter()
+            codes = decode(image)
+            times.append(time.perf_counter() - started)
+            found.append({code.data for code in codes})
+        reads[name] = found
+        times.sort()
+        results[name] = {"mean_ms": sum(times) / len(times) * 1000,
+                         "p90_ms": percentile(times, 90) * 1000}
+    for name, found in reads.items():
+        total = hits = 0
+        for i, (_, expected) in enumerate(frames):
+            if expected is None:
+                wanted = set().union(*(r[i] for r in reads.values()))
+            else:
+                wanted = {p.encode("utf-8") if isinstance(p, str) else p for p in expected}
+            total += len(wanted)
+            hits += len(found[i] & wanted)
+        results[name]["read_rate"] = hits / total if total else 1.0
+    reliable = [n for n in results if results[n]["read_rate"] >= min_read_rate]
+    if not reliable:
+        reliable = [max(results, key=lambda n: results[n]["read_rate"])]
+    primary = min(reliable, key=lambda n: results[n]["mean_ms"])
+    others = [n for n in results if n != primary]
+    fallback = max(others, key=lambda n: (results[n]["read_rate"], -results[n]["mean_ms"])) if others else None
+    return results, primary, fallback
+
+
+def print_calibration(results, primary, fallback):
+    print("Decoder calibration:")
+    for name, r in results.items():
+        role = "primary" if name == primary else "fallback" if name == fallback else ""
+        print(f"  {name:<8} {r['mean_ms']:>7.2f} ms/frame (p90 {r['p90_ms']:.2f}) "
+              f"read {r['read_rate']:.0%} {role}")
+
+
+# (primary, fallback) TimedDecoders for a backend name, or calibrated for "auto".
+# `frames` replaces the synthetic calibration frames, e.g. with frames from a camera.
+def choose_decoders(name="auto", frames=None):
+    if name != "auto":
+        return TimedDecoder(name, load_backend(name)), None
+    backends = available_backends()
+    if not backends:
+        raise ImportError(f"No QR decoder backend available; install one of: {', '.join(BACKEND_NAMES)}")
+    if len(backends) == 1:
+        name, decode = next(iter(backends.items()))
+        return TimedDecoder(name, decode), None
+    if frames is None:
+        try:
+            frames = calibration_frames()
+        except ImportError as e:
+            # Without qrcode there is nothing to calibrate on; keep the listed order
+            print(f"Skipping decoder calibration ({e}).")
+            names = list(backends)
+            return TimedDecoder(names[0], backends[names[0]]), TimedDecoder(names[1], backends[names[1]])
+    results, primary, fallback = calibrate(backends, frames)
+    print_calibration(results, primary, fallback)
+    return (TimedDecoder(primary, backends[primary]),
+            TimedDecoder(fallback, backends[fallback]) if fallback else None)
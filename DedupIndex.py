@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+
+
+# Set of already-ingested record keys, mirrored to an append-only JSON-lines file
+# so a scanner restarted mid-event still recognises records it has already taken in.
+# add() is atomic, so scanners on several cameras can share one index.
+class DedupIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self.keys = set()
+        self._file = None
+        self._lock = threading.Lock()
+        if path:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            self.keys.add(tuple(json.loads(line)))
+                        except (json.JSONDecodeError, TypeError):
+                            # A torn last line from a crash; skip it
+                            continue
+            self._file = open(path, "a")
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    # Returns True if the key is new (and records it), False if it was already seen.
+    def add(self, key):
+        with self._lock:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+            if self._file:
+                self._file.write(json.dumps(list(key)) + "\n")
+                self._file.flush()
+            return True
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
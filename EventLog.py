@@ -0,0 +1,146 @@
+import base64
+import time
+from array import array
+from Schema import COUNTER_KEYS
+
+# Everything the scout taps during a match, as (time, phase, key, delta) events held
+# column-wise in typed arrays: a few bytes per event however long the match runs.
+# Counter values are kept up to date from the events, so reading one is O(1), and a
+# cursor over the log gives O(1) undo and redo. Toggles ("moved", "broken") are
+# events too, with delta +1 when switched on and -1 when switched off.
+#
+# Saved matches carry the applied events as "timeline": "1:" followed by base64 of
+# one byte per event (phase/key code, high bit set for a negative delta) and the time
+# since the previous event in tenths of a second as a varint, so a full match of rapid
+# tapping costs about three characters per tap.
+
+PHASES = ["auto", "teleop"]
+TOGGLE_KEYS = ["moved", "broken"]
+KEYS = COUNTER_KEYS + TOGGLE_KEYS
+TICKS_PER_SECOND = 10
+TIMELINE_VERSION = "1"
+
+
+class EventLog:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.start = clock()
+        self.times = array("I")   # ticks since the log was started
+        self.codes = array("B")   # phase index * len(KEYS) + key index
+        self.deltas = array("b")
+        self.size = 0             # events currently applied; the rest can be redone
+        self.values = [[0] * len(KEYS) for _ in PHASES]
+
+    def __len__(self):
+        return self.size
+
+    def value(self, phase, key):
+        return self.values[PHASES.index(phase)][KEYS.index(key)]
+
+    def counters(self, phase):
+        values = self.values[PHASES.index(phase)]
+        return {key: values[i] for i, key in enumerate(COUNTER_KEYS)}
+
+    def is_on(self, phase, key):
+        return self.value(phase, key) > 0
+
+    def _apply(self, index, sign):
+        phase, key = divmod(self.codes[index], len(KEYS))
+        self.values[phase][key] += sign * self.deltas[index]
+        return PHASES[phase], KEYS[key]
+
+    # Record one tap and return the key's new value; anything undone is discarded
+    def record(self, phase, key, delta):
+        if delta not in (1, -1):
+            raise ValueError("Event deltas must be +1 or -1")
+        if self.size < len(self.codes):
+            del self.times[self.size:]
+            del self.codes[self.size:]
+            del self.deltas[self.size:]
+        ticks = int((self.clock() - self.start) * TICKS_PER_SECOND)
+        self.times.append(max(ticks, self.times[-1] if self.times else 0))
+        self.codes.append(PHASES.index(phase) * len(KEYS) + KEYS.index(key))
+        self.deltas.append(delta)
+        self._apply(self.size, 1)
+        self.size += 1
+        return self.value(phase, key)
+
+    def toggle(self, phase, key):
+        return self.record(phase, key, -1 if self.is_on(phase, key) else 1) > 0
+
+    # Undo the latest event (only if it belongs to `phase`, when given).
+    # Returns the (phase, key) that changed, or None.
+    def undo(self, phase=None):
+        if not self.size:
+            return None
+        if phase is not None and self.codes[self.size - 1] // len(KEYS) != PHASES.index(phase):
+            return None
+        self.size -= 1
+        return self._apply(self.size, -1)
+
+    def redo(self, phase=None):
+        if self.size >= len(self.codes):
+            return None
+        if phase is not None and self.codes[self.size] // len(KEYS) != PHASES.index(phase):
+            return None
+        self.size += 1
+        return self._apply(self.size - 1, 1)
+
+    # Applied events as (seconds, phase, key, delta)
+    def events(self):
+        for i in range(self.size):
+            phase, key = divmod(self.codes[i], len(KEYS))
+            yield self.times[i] / TICKS_PER_SECOND, PHASES[phase], KEYS[key], self.deltas[i]
+
+    def to_text(self):
+        out = bytearray()
+        previous = 0
+        for i in range(self.size):
+            out.append(self.codes[i] | (0x80 if self.deltas[i] < 0 else 0))
+            gap = self.times[i] - previous
+            previous = self.times[i]
+            while gap >= 0x80:
+                out.append(gap & 0x7F | 0x80)
+                gap >>= 7
+            out.append(gap)
+        return TIMELINE_VERSION + ":" + base64.urlsafe_b64encode(bytes(out)).decode("ascii").rstrip("=")
+
+    @classmethod
+    def from_text(cls, text, clock=time.monotonic):
+        version, _, body = (text or "").partition(":")
+        if version != TIMELINE_VERSION:
+            raise ValueError(f"Unsupported timeline version: {version!r}")
+        data = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+        log = cls(clock)
+        i = 0
+        ticks = 0
+        while i < len(data):
+            code = data[i]
+            gap = shift = 0
+            i += 1
+            while True:
+                if i >= len(data):
+                    raise ValueError("Truncated timeline")
+                byte = data[i]
+                i += 1
+                gap |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            ticks += gap
+            if code & 0x7F >= len(PHASES) * len(KEYS):
+                raise ValueError("Invalid timeline event")
+            log.times.append(ticks)
+            log.codes.append(code & 0x7F)
+            log.deltas.append(-1 if code & 0x80 else 1)
+            log._apply(log.size, 1)
+            log.size += 1
+        return log
+
+
+# Seconds between consecutive scoring taps (counter increments) in one phase, or
+# across the whole match when phase is None
+def cycle_times(events, phase=None):
+    times = [t for t, p, key, delta in events
+             if delta > 0 and key in COUNTER_KEYS and (phase is None or p == phase)]
+    return [round(b - a, 1) for a, b in zip(times, times[1:])]
@@ -0,0 +1,84 @@
+from PIL import Image
+
+# Delay used to coalesce drag events: at most one canvas update per display frame
+FRAME_MS = 16
+RECT_SIZE = 40
+START_X, START_Y = 10, 10
+
+
+# Starting-position canvas. Both alliance orientations of the field image are turned
+# into PhotoImages once, and the canvas items are created once and reconfigured for
+# each match (pass `flipped_image` if the mirrored view was already decoded). The
+# robot rectangle's position is tracked in plain numbers, so drags are clamped with
+# arithmetic instead of querying the canvas. Raw <B1-Motion> events only record the
+# pointer; one scheduled update per frame moves the rectangle.
+class StartingCanvas:
+    def __init__(self, canvas, field_image, to_photo, on_move=None, rect_size=RECT_SIZE, flipped_image=None):
+        self.canvas = canvas
+        self.width, self.height = field_image.size
+        self.size = rect_size
+        self.on_move = on_move
+        self.photos = {"Red": to_photo(field_image),
+                       "Blue": to_photo(flipped_image or field_image.transpose(Image.FLIP_LEFT_RIGHT))}
+        self.image_item = canvas.create_image(0, 0, anchor="nw", image=self.photos["Red"])
+        self.text_item = canvas.create_text(5, 5, text="", font=("Arial", 16, "bold"), anchor="nw")
+        self.rect = canvas.create_rectangle(0, 0, rect_size, rect_size, fill="red", outline="black")
+        self.x, self.y = START_X, START_Y
+        self.dragging = False
+        self.grab = (0, 0)
+        self.pointer = None
+        self.pending = None
+        canvas.bind("<ButtonPress-1>", self._on_press)
+        canvas.bind("<ButtonRelease-1>", self._on_release)
+        canvas.bind("<B1-Motion>", self._on_motion)
+        self._place(START_X, START_Y, notify=False)
+
+    def coords(self):
+        return [float(self.x), float(self.y), float(self.x + self.size), float(self.y + self.size)]
+
+    # Show the field for a new match and put the robot back at its start spot
+    def reset(self, team, color):
+        self.canvas.itemconfigure(self.image_item, image=self.photos["Blue" if color == "Blue" else "Red"])
+        self.canvas.itemconfigure(self.text_item, text=f"Team {team} - {color}",
+                                  fill="red" if color == "Red" else "blue")
+        self._cancel_pending()
+        self.dragging = False
+        self._place(START_X, START_Y)
+
+    def _place(self, x, y, notify=True):
+        self.x = min(max(0, x), self.width - self.size)
+        self.y = min(max(0, y), self.height - self.size)
+        self.canvas.coords(self.rect, self.x, self.y, self.x + self.size, self.y + self.size)
+        if notify and self.on_move:
+            self.on_move(self.coords())
+
+    def _cancel_pending(self):
+        if self.pending is not None:
+            self.canvas.after_cancel(self.pending)
+            self.pending = None
+
+    def _on_press(self, event):
+        if self.x <= event.x <= self.x + self.size and self.y <= event.y <= self.y + self.size:
+            self.dragging = True
+            self.grab = (event.x - self.x, event.y - self.y)
+
+    def _on_motion(self, event):
+        if not self.dragging:
+            return
+        self.pointer = (event.x, event.y)
+        if self.pending is None:
+            self.pending = self.canvas.after(FRAME_MS, self._apply)
+
+    def _apply(self):
+        self.pending = None
+        if self.pointer is not None:
+            self._place(self.pointer[0] - self.grab[0], self.pointer[1] - self.grab[1])
+            self.pointer = None
+
+    def _on_release(self, event):
+        if self.dragging:
+            # Land exactly where the finger was lifted
+            self._cancel_pending()
+            self.pointer = (event.x, event.y)
+            self._apply()
+        self.dragging = False
@@ -0,0 +1,94 @@
+import numpy as np
+from PIL import Image
+
+# Starting-position heatmaps built from the robot_coords rectangles saved with each
+# match. The app shows the field image mirrored for Blue, so Blue rectangles are
+# flipped back into the image's own orientation before binning; every heatmap is then
+# drawn on the unmirrored field. Rendered overlays are cached per (team, alliance)
+# and only redrawn after that team gets a new or edited match.
+
+BINS = (48, 24)  # (x, y)
+ALLIANCES = ("Red", "Blue", "Both")
+MAX_ALPHA = 200
+
+
+class StartHeatmaps:
+    def __init__(self, field_image, bins=BINS):
+        self.field = field_image.convert("RGBA")
+        self.width, self.height = self.field.size
+        self.bins = bins
+        self.points = {}    # (team, alliance) -> {record key: (x, y)}
+        self.owners = {}    # record key -> (team, alliance) it is filed under
+        self.versions = {}  # team -> change counter
+        self.cache = {}     # (team, alliance) -> (version, image)
+
+    def teams(self):
+        return sorted({team for team, _ in self.points}, key=lambda t: (len(t), t))
+
+    def _remove(self, key):
+        owner = self.owners.pop(key, None)
+        if owner is None:
+            return
+        points = self.points[owner]
+        del points[key]
+        if not points:
+            del self.points[owner]
+        self.versions[owner[0]] = self.versions.get(owner[0], 0) + 1
+
+    # Add (or replace) the starting position of one match record
+    def add(self, data):
+        key = (data.get("match_number", ""), data.get("scouter_name", ""))
+        coords = data.get("auto", {}).get("robot_coords")
+        alliance = data.get("selected_color")
+        team = str(data.get("team_number", ""))
+        # Edited matches come through again, possibly with another team or alliance,
+        # or without a start position; the old point goes wherever it was filed
+        if self.owners.get(key) not in (None, (team, alliance)):
+            self._remove(key)
+        if not coords or len(coords) != 4 or alliance not in ("Red", "Blue"):
+            self._remove(key)
+            return
+        x = (coords[0] + coords[2]) / 2
+        y = (coords[1] + coords[3]) / 2
+        if alliance == "Blue":
+            x = self.width - x
+        points = self.points.setdefault((team, alliance), {})
+        self.owners[key] = (team, alliance)
+        if points.get(key) != (x, y):
+            points[key] = (x, y)
+            self.versions[team] = self.versions.get(team, 0) + 1
+
+    def add_many(self, records):
+        for data in records:
+            self.add(data)
+
+    # Share of starts in each bin, shape (bins_y, bins_x)
+    def histogram(self, team, alliance="Both"):
+        sides = ("Red", "Blue") if alliance == "Both" else (alliance,)
+        points = [p for side in sides for p in self.points.get((team, side), {}).values()]
+        if not points:
+            return np.zeros((self.bins[1], self.bins[0]))
+        xy = np.asarray(points, dtype=np.float64)
+        counts, _, _ = np.histogram2d(xy[:, 1], xy[:, 0], bins=(self.bins[1], self.bins[0]),
+                                      range=((0, self.height), (0, self.width)))
+        return counts / len(points)
+
+    def _overlay(self, hist):
+        peak = hist.max()
+        t = hist / peak if peak > 0 else hist
+        rgba = np.zeros(hist.shape + (4,), dtype=np.uint8)
+        rgba[..., 0] = 255
+        rgba[..., 1] = (255 * (1 - t)).astype(np.uint8)
+        rgba[..., 3] = (MAX_ALPHA * np.sqrt(t)).astype(np.uint8)
+        return Image.fromarray(rgba, "RGBA").resize((self.width, self.height), Image.BILINEAR)
+
+    # Field image with the team's heatmap drawn over it
+    def render(self, team, alliance="Both"):
+        team = str(team)
+        version = self.versions.get(team, 0)
+        cached = self.cache.get((team, alliance))
+        if cached and cached[0] == version:
+            return cached[1]
+        image = Image.alpha_composite(self.field, self._overlay(self.histogram(team, alliance)))
+        self.cache[(team, alliance)] = (version, image)
+        return image
@@ -0,0 +1,106 @@
+import customtkinter
+
+# Scrolling match list that only creates widgets for the rows on screen. A fixed
+# pool of buttons (one per visible row, plus one) is placed over the viewport and
+# re-labelled as the list scrolls, so building and scrolling cost the same for 60
+# matches or 600. `rows` is the list of item ids being shown; `describe(item)`
+# gives a row's label and `on_select(item)` is called when a row is clicked.
+
+ROW_HEIGHT = 38
+ROW_PAD = 5
+WHEEL_ROWS = 3
+
+
+class MatchList:
+    def __init__(self, parent, describe, on_select, width=280, height=500, row_height=ROW_HEIGHT):
+        self.describe = describe
+        self.on_select = on_select
+        self.row_height = row_height
+        self.width = width
+        self.rows = []
+        self.offset = 0          # pixels scrolled from the top
+        self.pool = []           # buttons, reused for whichever rows are visible
+        self.shown = []          # item each pooled button is labelled for
+        self.frame = customtkinter.CTkFrame(parent, width=width, height=height)
+        self.viewport = customtkinter.CTkFrame(self.frame, width=width - 20, height=height, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar = customtkinter.CTkScrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.viewport.bind("<Configure>", lambda event: self.redraw())
+        for widget in (self.viewport, self.frame):
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", lambda event: self.scroll(-WHEEL_ROWS * self.row_height))
+            widget.bind("<Button-5>", lambda event: self.scroll(WHEEL_ROWS * self.row_height))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_rows(self, rows):
+        self.rows = list(rows)
+        self.offset = 0
+        self.redraw()
+
+    def _max_offset(self):
+        return max(0, len(self.rows) * self.row_height - self.viewport.winfo_height())
+
+    def scroll(self, pixels):
+        offset = int(min(max(0, self.offset + pixels), self._max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.redraw()
+
+    def scroll_to(self, item):
+        if item in self.rows:
+            self.offset = min(self.rows.index(item) * self.row_height, self._max_offset())
+            self.redraw()
+
+    # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+    def yview(self, *args):
+        total = len(self.rows) * self.row_height
+        if args and args[0] == "moveto":
+            self.scroll(float(args[1]) * total - self.offset)
+        elif args and args[0] == "scroll":
+            step = self.viewport.winfo_height() if args[2] == "pages" else self.row_height
+            self.scroll(int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        self.scroll(-WHEEL_ROWS * self.row_height if event.delta > 0 else WHEEL_ROWS * self.row_height)
+
+    def _button(self):
+        button = customtkinter.CTkButton(self.viewport, text="", width=self.width - 40,
+                                         height=self.row_height - ROW_PAD)
+        button.bind("<MouseWheel>", self._on_wheel)
+        button.bind("<Button-4>", lambda event: self.scroll(-WHEEL_ROWS * self.row_height))
+        button.bind("<Button-5>", lambda event: self.scroll(WHEEL_ROWS * self.row_height))
+        self.pool.append(button)
+        self.shown.append(None)
+        return button
+
+    # Labels changed (e.g. a match was saved); re-describe the visible rows
+    def refresh(self):
+        self.redraw(relabel=True)
+
+    # Move the pooled buttons over the rows currently in view; a button is only
+    # re-labelled when it starts showing a different row
+    def redraw(self, relabel=False):
+        height = max(self.viewport.winfo_height(), self.row_height)
+        first = self.offset // self.row_height
+        needed = height // self.row_height + 2
+        while len(self.pool) < needed:
+            self._button()
+        for slot, button in enumerate(self.pool):
+            index = first + slot
+            if slot < needed and index < len(self.rows):
+                item = self.rows[index]
+                if relabel or self.shown[slot] != item:
+                    button.configure(text=self.describe(item), command=lambda item=item: self.on_select(item))
+                    self.shown[slot] = item
+                button.place(x=10, y=index * self.row_height - self.offset)
+            elif self.shown[slot] is not None:
+                button.place_forget()
+                self.shown[slot] = None
+        total = len(self.rows) * self.row_height
+        if total > height:
+            self.scrollbar.set(self.offset / total, (self.offset + height) / total)
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,127 @@
+from EventLog import EventLog, PHASES, KEYS
+
+# Everything about the match being scouted, in one place. Changes only mark what is
+# dirty; the widgets are redrawn by a single flush scheduled through `schedule`
+# (root.after_idle in the app), so a burst of taps or a match switch within one
+# event-loop turn costs one redraw. Views are plain callables registered with
+# `bind`, which keeps the model free of Tk and easy to drive from a test:
+#
+#   state = MatchState(schedule=lambda flush: flush())
+#   state.bind("counter", lambda phase, key, value: ...)
+
+FIELDS = ("match", "team", "color", "climb", "robot_coords", "toggles")
+DEFAULT_CLIMB = "No barge"
+
+
+class MatchState:
+    __slots__ = ("match", "team", "color", "climb", "robot_coords", "log",
+                 "schedule", "views", "dirty", "dirty_counters", "flush_pending")
+
+    def __init__(self, schedule=None):
+        self.schedule = schedule
+        self.views = {}
+        self.dirty = set()
+        self.dirty_counters = set()
+        self.flush_pending = False
+        self.reset()
+
+    # View names: "counter" is called as view(phase, key, value); every other name in
+    # FIELDS as view(state)
+    def bind(self, name, view):
+        self.views[name] = view
+
+    def _changed(self, *names, counters=()):
+        self.dirty.update(names)
+        self.dirty_counters.update(counters)
+        if self.flush_pending:
+            return
+        if self.schedule is None:
+            self.flush()
+        else:
+            self.flush_pending = True
+            self.schedule(self.flush)
+
+    # Start over with a blank match; `match` is the one being selected, if any
+    def reset(self, match=None):
+        self.match = match
+        self.team = ""
+        self.color = None
+        self.climb = DEFAULT_CLIMB
+        self.robot_coords = None
+        self.log = EventLog()
+        self.refresh()
+
+    # Mark everything dirty, e.g. after new widgets were bound or built
+    def refresh(self):
+        self._changed(*FIELDS, counters=[(phase, key) for phase in PHASES for key in KEYS])
+
+    # Set any of the plain fields, e.g. state.update(team="254", color="Red")
+    def update(self, **fields):
+        changed = []
+        for name, value in fields.items():
+            if name not in FIELDS or name == "toggles":
+                raise AttributeError(name)
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed.append(name)
+        if changed:
+            self._changed(*changed)
+
+    # Restart the timeline clock when the match actually begins
+    def start_timeline(self):
+        self.log = EventLog()
+        self._changed("toggles", counters=[(phase, key) for phase in PHASES for key in KEYS])
+
+    def record(self, phase, key, delta):
+        value = self.log.record(phase, key, delta)
+        self._changed(counters=[(phase, key)])
+        return value
+
+    def toggle(self, phase, key):
+        on = self.log.toggle(phase, key)
+        self._changed("toggles")
+        return on
+
+    def undo(self, phase=None):
+        return self._after_history(self.log.undo(phase))
+
+    def redo(self, phase=None):
+        return self._after_history(self.log.redo(phase))
+
+    def _after_history(self, changed):
+        if changed:
+            self._changed("toggles", counters=[changed])
+        return changed
+
+    def moved(self):
+        return "Yes" if self.log.is_on("auto", "moved") else "No"
+
+    def broken(self):
+        return "Yes" if self.log.is_on("teleop", "broken") else "No"
+
+    # The match record saved to disk, shown as a QR code and uploaded
+    def to_record(self, scouter_name="", auto_comment="", teleop_comment=""):
+        return {
+            "match_number": self.match,
+            "team_number": self.team,
+            "selected_color": self.color,
+            "scouter_name": scouter_name,
+            "auto": {"counters": self.log.counters("auto"), "moved_state": self.moved(),
+                     "robot_coords": self.robot_coords, "climb_state": "N/A", "comment": auto_comment},
+            "teleop": {"counters": self.log.counters("teleop"), "climb_state": self.climb,
+                       "teleop_broken_state": self.broken(), "comment": teleop_comment},
+            "timeline": self.log.to_text()
+        }
+
+    # Push every pending change to the bound views, once each
+    def flush(self):
+        self.flush_pending = False
+        dirty, self.dirty = self.dirty, set()
+        counters, self.dirty_counters = self.dirty_counters, set()
+        view = self.views.get("counter")
+        if view is not None:
+            for phase, key in counters:
+                view(phase, key, self.log.value(phase, key))
+        for name in FIELDS:
+            if name in dirty and name in self.views:
+                self.views[name](self)
@@ -0,0 +1,154 @@
+import json
+import os
+
+# Superseded journal entries allowed to pile up before the journal is compacted
+DEFAULT_COMPACT_AFTER = 200
+
+
+def _fsync_dir(path):
+    # Make a rename durable; directories cannot be opened for fsync on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Replay a journal into a dict without touching the file, so it is safe to run on a
+# journal the app is still writing. Returns (data, entries, end), where `end` is the
+# offset just past the last complete entry; anything after it is a write torn by a
+# crash. A corrupt line followed by good ones is skipped instead of ending the replay.
+def replay_journal(path):
+    data = {}
+    entries = 0
+    end = offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+                key = entry["k"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if entry.get("d"):
+                data.pop(key, None)
+            else:
+                data[key] = entry.get("v")
+            entries += 1
+            end = offset
+    return data, entries, end
+
+
+# Crash-safe match storage. Every write appends one JSON line ({"k": key, "v": value},
+# or {"k": key, "d": 1} for a delete) and fsyncs it, so saving a match costs the same
+# however long the history is. Startup replays the journal; a line torn by a crash
+# mid-write is cut off. Once enough entries are superseded the journal is rewritten
+# to a temp file and atomically swapped in. Behaves like a dict of match -> record.
+class MatchStore:
+    def __init__(self, path, legacy_path=None, compact_after=DEFAULT_COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self.data = {}
+        self.entries = 0
+        if os.path.exists(path):
+            self._replay()
+        elif legacy_path and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        self.data, self.entries, valid_end = replay_journal(self.path)
+        if valid_end < os.path.getsize(self.path):
+            print(f"Discarding a partial write at the end of {self.path}.")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+    # One-time import of the old single-document match_data.json; the old file is left
+    # as is. An unreadable file raises before the journal exists, so the import is tried
+    # again on the next start instead of silently starting with no matches.
+    def _migrate(self, legacy_path):
+        try:
+            with open(legacy_path, "r") as f:
+                data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"Could not import {legacy_path}: {e}. Fix or move the file and restart.") from e
+        if not isinstance(data, dict):
+            raise ValueError(f"Could not import {legacy_path}: expected an object of match -> record.")
+        self.data = data
+        self._write_snapshot()
+        print(f"Migrated {len(self.data)} matches from {legacy_path} to {self.path}.")
+
+    def _write_snapshot(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, value in self.data.items():
+                f.write(json.dumps({"k": key, "v": value}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+        self.entries = len(self.data)
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.entries += 1
+        if self.entries - len(self.data) >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        self.file.close()
+        self._write_snapshot()
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self.file.close()
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self._append({"k": key, "v": value})
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self._append({"k": key, "d": 1})
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def keys(self):
+        return self.data.keys()
+
+    def values(self):
+        return self.data.values()
+
+    def items(self):
+        return self.data.items()
+
+
+# Records from match_data.json, a MatchStore journal, or JSON-lines scanner output
+def load_records(path):
+    if path.endswith(".journal"):
+        return list(replay_journal(path)[0].values())
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return list(data.values()) if isinstance(data, dict) else data
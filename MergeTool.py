@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from MatchStore import load_records
+from Schema import write_csv
+
+# Merges the match files of many tablets into one dataset. Every record is indexed
+# by (match, team, scout) with a hash of its content. Scout names are missing from
+# records saved by older app versions, so those fall back to the path of the input
+# the record came from. Every tablet's file is called match_data.json, so the whole
+# path (t1/match_data.json, t2/match_data.json) is used, not just the file name; two
+# tablets scouting the same robot are then kept apart instead of counted as a conflict.
+#
+# Sync is incremental: a state file remembers each input's size and modification
+# time and the hashes of its records, plus every record by hash. Unchanged inputs are
+# not read again, and only the records of changed inputs are hashed.
+#
+# When devices disagree on a key, the copy with the latest "saved_at" wins, with ties
+# broken by content hash. The result does not depend on the order of the inputs.
+
+DEFAULT_STATE = "merge_state.json"
+DEFAULT_OUTPUT = "merged_matches.jsonl"
+STATE_VERSION = 2
+INPUT_EXTENSIONS = (".json", ".journal", ".jsonl")
+
+
+def record_key(data, source):
+    scout = str(data.get("scouter_name") or "").strip() or f"@{source}"
+    return [str(data.get("match_number") or ""), str(data.get("team_number") or "").strip(), scout]
+
+
+def content_hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+# "Match 9" sorts before "Match 10"
+def match_sort_key(key):
+    match = re.search(r"(\d+)$", key[0])
+    return (int(match.group(1)) if match else float("inf"), key[0], key[1], key[2])
+
+
+def find_inputs(paths, exclude=()):
+    exclude = {os.path.abspath(p) for p in exclude if p}
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(INPUT_EXTENSIONS):
+                    found.append(os.path.join(path, name))
+        else:
+            found.append(path)
+    return [p for p in found if os.path.abspath(p) not in exclude]
+
+
+class MergeEngine:
+    def __init__(self, state_path=None):
+        self.state_path = state_path
+        self.files = {}     # input path -> {"sig": [size, mtime_ns], "keys": {key json: [hash, saved_at]}}
+        self.records = {}   # content hash -> record
+        self.dirty = False
+        if state_path and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                self.files = state["files"]
+                self.records = state["records"]
+            else:
+                print(f"Ignoring {state_path}: written by a different version; doing a full merge.")
+
+    # Bring the index up to date with the given inputs; returns counts of what was read
+    def sync(self, paths):
+        stats = {"files": 0, "unchanged": 0, "read": 0, "records": 0, "changed": 0, "errors": 0}
+        for path in paths:
+            stats["files"] += 1
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                print(f"Skipping {path}: {e}")
+                stats["errors"] += 1
+                continue
+            sig = [st.st_size, st.st_mtime_ns]
+            entry = self.files.get(path)
+            if entry and entry["sig"] == sig:
+                stats["unchanged"] += 1
+                continue
+            try:
+                records = load_records(path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {path}: {e}")
+                stats["errors"] += 1
+                continue
+            stats["read"] += 1
+            old_keys = entry["keys"] if entry else {}
+            source = os.path.normpath(path).replace(os.sep, "/")
+            keys = {}
+            for data in records:
+                if not isinstance(data, dict):
+                    continue
+                digest = content_hash(data)
+                key = json.dumps(record_key(data, source))
+                keys[key] = [digest, str(data.get("saved_at") or "")]
+                self.records[digest] = data
+                stats["records"] += 1
+                if old_keys.get(key, [None])[0] != digest:
+                    stats["changed"] += 1
+            self.files[path] = {"sig": sig, "keys": keys}
+            self.dirty = True
+        # Inputs deleted from disk no longer contribute
+        for path in [p for p in self.files if not os.path.exists(p)]:
+            del self.files[path]
+            self.dirty = True
+        return stats
+
+    # One record per key, plus the keys whose devices disagreed
+    def merged(self):
+        candidates = {}
+        for entry in self.files.values():
+            for key, (digest, saved_at) in entry["keys"].items():
+                candidates.setdefault(key, set()).add((saved_at, digest))
+        records = []
+        conflicts = []
+        for key in sorted(candidates, key=lambda k: match_sort_key(json.loads(k))):
+            versions = candidates[key]
+            saved_at, digest = max(versions)
+            if len(versions) > 1:
+                conflicts.append((json.loads(key), len(versions), saved_at))
+            records.append(self.records[digest])
+        return records, conflicts
+
+    def save(self):
+        if not self.state_path or not self.dirty:
+            return
+        used = {digest for entry in self.files.values() for digest, _ in entry["keys"].values()}
+        state = {"version": STATE_VERSION, "files": self.files,
+                 "records": {digest: data for digest, data in self.records.items() if digest in used}}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # json.dumps runs in C; json.dump to a file encodes in pure Python
+            f.write(json.dumps(state, separators=(",", ":")))
+        os.replace(tmp_path, self.state_path)
+        self.dirty = False
+
+
+def write_records(path, records):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for data in records:
+                f.write(json.dumps(data) + "\n")
+        else:
+            f.write(json.dumps(records, indent=2))
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge match files from several tablets into one dataset.")
+    parser.add_argument("inputs", nargs="+", help="match_data.json / *.journal / *.jsonl files or folders of them")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="incremental sync state file")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="merged records (.jsonl or .json)")
+    parser.add_argument("--csv", help="also write the merged records as a CSV in sheet column order")
+    parser.add_argument("--full", action="store_true", help="ignore the state file and re-read every input")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    engine = MergeEngine(None if args.full else args.state)
+    engine.state_path = args.state
+    engine.dirty = args.full
+    stats = engine.sync(find_inputs(args.inputs, exclude=[args.state, args.output, args.csv]))
+    records, conflicts = engine.merged()
+    write_records(args.output, records)
+    if args.csv:
+        write_csv(args.csv, records)
+    engine.save()
+
+    for (match, team, scout), count, saved_at in conflicts:
+        print(f"Conflict: {match} team {team} scout {scout}: {count} versions, kept the one saved {saved_at or 'at an unknown time'}")
+    print(f"{stats['files']} inputs ({stats['unchanged']} unchanged, {stats['read']} read, {stats['errors']} errors), "
+          f"{stats['changed']} new or changed records")
+    print(f"Wrote {len(records)} merged records to {args.output} ({len(conflicts)} conflicts) "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+import re
+import zlib
+from Schema import COUNTER_KEYS
+
+# QR payload formats understood by the scanner:
+#   legacy  - the full match dict as JSON, starts with "{"
+#   "BS1:"  - version 1 compact form: a positional JSON array (byte mode)
+#   "BZ1:"  - version 1 compact form, zlib-compressed and base45-encoded so the whole
+#             payload fits QR alphanumeric mode
+COMPACT_PREFIX = "BS1:"
+ZIPPED_PREFIX = "BZ1:"
+FORMAT_VERSION = 1
+
+# Enum tables; values not listed are stored as plain strings
+COLORS = [None, "Red", "Blue"]
+YES_NO = ["No", "Yes", "NO", "YES"]
+CLIMB_STATES = ["No barge", "DEEP", "SHALLOW", "PARK", "NONE", "N/A", "Yes", "No"]
+
+BASE45_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+BASE45_VALUES = {c: i for i, c in enumerate(BASE45_CHARSET)}
+
+
+def base45_encode(data):
+    out = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        n, c = divmod(n, 45)
+        e, d = divmod(n, 45)
+        out += [BASE45_CHARSET[c], BASE45_CHARSET[d], BASE45_CHARSET[e]]
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        out += [BASE45_CHARSET[c], BASE45_CHARSET[d]]
+    return "".join(out)
+
+
+def base45_decode(text):
+    try:
+        values = [BASE45_VALUES[c] for c in text]
+    except KeyError:
+        raise ValueError("Invalid base45 character")
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            n = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            if n > 0xFFFF:
+                raise ValueError("Invalid base45 triplet")
+            out += bytes(divmod(n, 256))
+        elif len(chunk) == 2:
+            n = chunk[0] + chunk[1] * 45
+            if n > 0xFF:
+                raise ValueError("Invalid base45 pair")
+            out.append(n)
+        else:
+            raise ValueError("Truncated base45 data")
+    return bytes(out)
+
+
+def _enum(value, table):
+    return table.index(value) if value in table else value
+
+
+def _unenum(value, table):
+    return table[value] if isinstance(value, int) and 0 <= value < len(table) else value
+
+
+# "Match 12" -> 12 and "254" -> 254, anything else is kept as a string
+def _pack_number(value, prefix=""):
+    match = re.fullmatch(re.escape(prefix) + r"(\d{1,9})", value) if isinstance(value, str) else None
+    return int(match.group(1)) if match and str(int(match.group(1))) == match.group(1) else value
+
+
+def _unpack_number(value, prefix=""):
+    return f"{prefix}{value}" if isinstance(value, int) else value
+
+
+def _pack_counters(counters):
+    return [counters.get(key, 0) for key in COUNTER_KEYS]
+
+
+def _unpack_counters(values):
+    return dict(zip(COUNTER_KEYS, values))
+
+
+def _pack_coords(coords):
+    return [round(v) for v in coords] if coords else 0
+
+
+def _unpack_coords(coords):
+    return [float(v) for v in coords] if coords else None
+
+
+TOP_KEYS = ("match_number", "team_number", "selected_color", "scouter_name", "auto", "teleop")
+AUTO_KEYS = ("counters", "moved_state", "robot_coords", "climb_state", "comment")
+TELEOP_KEYS = ("counters", "climb_state", "teleop_broken_state", "comment")
+
+
+# Positional array for one match record. Keys the schema does not know about are kept
+# in up to three trailing dicts (top level, auto, teleop) so newer app versions can add
+# fields without a format bump.
+def pack_record(data):
+    auto = data.get("auto", {})
+    teleop = data.get("teleop", {})
+    fields = [
+        FORMAT_VERSION,
+        _pack_number(data.get("match_number", ""), "Match "),
+        _pack_number(data.get("team_number", "")),
+        _enum(data.get("selected_color"), COLORS),
+        data.get("scouter_name", ""),
+        _pack_counters(auto.get("counters", {})),
+        _enum(auto.get("moved_state", ""), YES_NO),
+        _pack_coords(auto.get("robot_coords")),
+        _enum(auto.get("climb_state", "N/A"), CLIMB_STATES),
+        auto.get("comment", ""),
+        _pack_counters(teleop.get("counters", {})),
+        _enum(teleop.get("climb_state", ""), CLIMB_STATES),
+        _enum(teleop.get("teleop_broken_state", ""), YES_NO),
+        teleop.get("comment", ""),
+    ]
+    extras = [{k: v for k, v in data.items() if k not in TOP_KEYS},
+              {k: v for k, v in auto.items() if k not in AUTO_KEYS},
+              {k: v for k, v in teleop.items() if k not in TELEOP_KEYS}]
+    while extras and not extras[-1]:
+        extras.pop()
+    return fields + extras
+
+
+def unpack_record(fields):
+    if not isinstance(fields, list) or not fields or fields[0] != FORMAT_VERSION:
+        raise ValueError("Unsupported compact payload version")
+    (_, match_number, team_number, color, scouter, auto_counters, moved, coords, auto_climb,
+     auto_comment, teleop_counters, climb, broken, teleop_comment) = fields[:14]
+    extra, auto_extra, teleop_extra = (list(fields[14:17]) + [{}, {}, {}])[:3]
+    auto = {"counters": _unpack_counters(auto_counters), "moved_state": _unenum(moved, YES_NO),
+            "robot_coords": _unpack_coords(coords), "climb_state": _unenum(auto_climb, CLIMB_STATES),
+            "comment": auto_comment}
+    auto.update(auto_extra)
+    teleop = {"counters": _unpack_counters(teleop_counters), "climb_state": _unenum(climb, CLIMB_STATES),
+              "teleop_broken_state": _unenum(broken, YES_NO), "comment": teleop_comment}
+    teleop.update(teleop_extra)
+    data = {
+        "match_number": _unpack_number(match_number, "Match "),
+        "team_number": _unpack_number(team_number),
+        "selected_color": _unenum(color, COLORS),
+        "scouter_name": scouter,
+        "auto": auto,
+        "teleop": teleop,
+    }
+    data.update(extra)
+    return data
+
+
+# Saved with every record but left out of single-match QR codes: the event timeline
+# is base64 that zlib barely shrinks, so it would push each code up several versions
+QR_OMITTED_KEYS = ("timeline",)
+
+
+def qr_record(data):
+    return {k: v for k, v in data.items() if k not in QR_OMITTED_KEYS}
+
+
+# Approximate QR data bits: alphanumeric mode costs 5.5 bits a character, byte mode 8
+def _qr_bits(text):
+    if all(c in BASE45_VALUES for c in text):
+        return len(text) * 5.5
+    return len(text.encode("utf-8")) * 8
+
+
+# Encode a match record for a QR code; with compress=True the zlib/base45 form is used
+# whenever it needs fewer QR bits than the plain compact form.
+def encode_payload(data, compress=True):
+    packed = json.dumps(pack_record(data), separators=(",", ":"), ensure_ascii=False)
+    compact = COMPACT_PREFIX + packed
+    if not compress:
+        return compact
+    zipped = ZIPPED_PREFIX + base45_encode(zlib.compress(packed.encode("utf-8"), 9))
+    return zipped if _qr_bits(zipped) < _qr_bits(compact) else compact
+
+
+# Decode any supported payload (legacy JSON or compact) back into a match record
+def decode_payload(text):
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    if text.startswith(ZIPPED_PREFIX):
+        packed = zlib.decompress(base45_decode(text[len(ZIPPED_PREFIX):])).decode("utf-8")
+        return unpack_record(json.loads(packed))
+    if text.startswith(COMPACT_PREFIX):
+        return unpack_record(json.loads(text[len(COMPACT_PREFIX):]))
+    return json.loads(text)
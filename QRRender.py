@@ -0,0 +1,131 @@
+import hashlib
+import itertools
+import queue
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 128
+# How often the Tk side checks for finished renders while work is outstanding
+POLL_MS = 30
+
+# Render priorities: on-screen requests jump ahead of idle prewarming
+PRIORITY_NOW = 0
+PRIORITY_PREWARM = 1
+
+
+# qrcode is imported on first use; in the app that happens on the render thread
+def make_qr_image(data_str):
+    import qrcode
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)
+    qr.add_data(data_str)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
+
+def payload_key(data_str):
+    return hashlib.sha1(data_str.encode("utf-8")).hexdigest()
+
+
+# Memoized QR rendering for the Tk app. QR matrices and PIL images are built on a
+# background thread; the Tk PhotoImage is created on the Tk thread (polled via
+# root.after) and kept in an LRU cache keyed by payload hash.
+class QRRenderer:
+    def __init__(self, root, to_photo, render=make_qr_image, cache_size=DEFAULT_CACHE_SIZE):
+        self.root = root
+        self.to_photo = to_photo
+        self.render = render
+        self.cache_size = cache_size
+        self.photos = OrderedDict()   # key -> PhotoImage, Tk thread only
+        self.images = OrderedDict()   # key -> PIL image, guarded by lock
+        self.waiting = {}             # key -> [callbacks], Tk thread only
+        self.waiting_data = {}        # key -> data_str of a waited-for render, Tk thread only
+        self.lock = threading.Lock()
+        self.jobs = queue.PriorityQueue()
+        self.done = queue.Queue()
+        self.order = itertools.count()
+        self.queued = set()
+        self.polling = False
+        threading.Thread(target=self._worker, name="qr-render", daemon=True).start()
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _worker(self):
+        while True:
+            _, _, key, data_str = self.jobs.get()
+            with self.lock:
+                cached = key in self.images
+            if not cached:
+                image = self.render(data_str)
+                with self.lock:
+                    self._remember(self.images, key, image)
+            self.done.put(key)
+
+    def _submit(self, key, data_str, priority):
+        if (key, priority) in self.queued:
+            return
+        self.queued.add((key, priority))
+        self.jobs.put((priority, next(self.order), key, data_str))
+
+    def _poll(self):
+        while True:
+            try:
+                key = self.done.get_nowait()
+            except queue.Empty:
+                break
+            self.queued.discard((key, PRIORITY_NOW))
+            self.queued.discard((key, PRIORITY_PREWARM))
+            # Prewarmed codes get their PhotoImage now too, so selecting them is instant
+            photo = self._photo(key)
+            if photo is not None:
+                self.waiting_data.pop(key, None)
+                for callback in self.waiting.pop(key, []):
+                    callback(photo)
+            elif key in self.waiting:
+                # Evicted by newer renders before the Tk side got to it; render again
+                self._submit(key, self.waiting_data[key], PRIORITY_NOW)
+        if self.waiting or self.queued:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self.polling = False
+
+    def _start_polling(self):
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def _photo(self, key):
+        if key in self.photos:
+            self.photos.move_to_end(key)
+            return self.photos[key]
+        with self.lock:
+            image = self.images.get(key)
+        if image is None:
+            return None
+        photo = self.to_photo(image)
+        self._remember(self.photos, key, photo)
+        return photo
+
+    # Call `callback(photo)` with the QR code for data_str: immediately when cached,
+    # otherwise from the Tk loop once the background render finishes.
+    def request(self, data_str, callback):
+        key = payload_key(data_str)
+        photo = self._photo(key)
+        if photo is not None:
+            callback(photo)
+            return
+        self.waiting.setdefault(key, []).append(callback)
+        self.waiting_data[key] = data_str
+        self._submit(key, data_str, PRIORITY_NOW)
+        self._start_polling()
+
+    # Render payloads in the background ahead of time
+    def prewarm(self, payloads):
+        for data_str in payloads:
+            key = payload_key(data_str)
+            if key not in self.photos:
+                self._submit(key, data_str, PRIORITY_PREWARM)
+        self._start_polling()
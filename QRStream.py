@@ -0,0 +1,194 @@
+import bisect
+import json
+import math
+import random
+import struct
+import zlib
+from Payload import base45_encode, base45_decode, pack_record, unpack_record
+
+# Multi-match QR export stream. A batch of records is compressed, split into fixed-size
+# blocks and sent as an endless sequence of fountain-coded frames: frame n carries the
+# XOR of a pseudo-random subset of blocks chosen from (stream id, n). The first frames
+# are the plain blocks in order, so a clean scan needs exactly one frame per block,
+# and a missed frame is made up by any later one instead of waiting for the cycle to
+# come round again.
+#
+# Frame text: "BF1:" + base45(header + block), which fits QR alphanumeric mode.
+STREAM_PREFIX = "BF1:"
+# stream id, block count, data length, crc32 of the data, frame sequence number
+HEADER = struct.Struct(">HHIII")
+DEFAULT_BLOCK_SIZE = 180
+
+
+def is_stream_frame(text):
+    if isinstance(text, bytes):
+        return text.startswith(STREAM_PREFIX.encode("ascii"))
+    return text.startswith(STREAM_PREFIX)
+
+
+# Small deterministic PRNG (xorshift32) so encoder and decoder agree on block choices
+# whatever Python version each side runs
+class _Prng:
+    def __init__(self, seed):
+        self.state = (seed * 2654435761 + 0x9E3779B9) & 0xFFFFFFFF or 1
+
+    def random(self):
+        x = self.state
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        self.state = x
+        return x / 4294967296.0
+
+
+# Cumulative robust soliton distribution over degrees 1..k
+def _degree_cdf(k, c=0.1, delta=0.5):
+    s = c * math.log(k / delta) * math.sqrt(k) if k > 1 else 1.0
+    pivot = max(1, min(k, int(round(k / s)))) if s > 0 else k
+    weights = []
+    for d in range(1, k + 1):
+        rho = 1.0 / k if d == 1 else 1.0 / (d * (d - 1))
+        if d < pivot:
+            tau = s / (k * d)
+        elif d == pivot:
+            tau = s * math.log(s / delta) / k if s > delta else 0.0
+        else:
+            tau = 0.0
+        weights.append(rho + tau)
+    total = sum(weights)
+    cdf, acc = [], 0.0
+    for w in weights:
+        acc += w / total
+        cdf.append(acc)
+    return cdf
+
+
+# Indices of the blocks XORed into frame `seq`
+def frame_blocks(stream_id, k, seq, cdf):
+    if seq < k:
+        return [seq]
+    rng = _Prng((stream_id << 32) | seq)
+    degree = min(k, bisect.bisect_left(cdf, rng.random()) + 1)
+    picked = set()
+    while len(picked) < degree:
+        picked.add(int(rng.random() * k))
+    return sorted(picked)
+
+
+def encode_records(records):
+    packed = json.dumps([pack_record(r) for r in records], separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(packed.encode("utf-8"), 9)
+
+
+def decode_records(data):
+    return [unpack_record(fields) for fields in json.loads(zlib.decompress(data).decode("utf-8"))]
+
+
+class StreamEncoder:
+    def __init__(self, data, block_size=DEFAULT_BLOCK_SIZE, stream_id=None):
+        self.stream_id = random.getrandbits(16) if stream_id is None else stream_id
+        self.block_size = block_size
+        self.length = len(data)
+        self.crc = zlib.crc32(data)
+        self.k = max(1, -(-len(data) // block_size))
+        padded = data.ljust(self.k * block_size, b"\0")
+        self.blocks = [int.from_bytes(padded[i * block_size:(i + 1) * block_size], "big")
+                       for i in range(self.k)]
+        self.cdf = _degree_cdf(self.k)
+
+    def frame(self, seq):
+        value = 0
+        for i in frame_blocks(self.stream_id, self.k, seq, self.cdf):
+            value ^= self.blocks[i]
+        header = HEADER.pack(self.stream_id, self.k, self.length, self.crc, seq)
+        return STREAM_PREFIX + base45_encode(header + value.to_bytes(self.block_size, "big"))
+
+
+# Reassembles one stream by peeling: a frame reduced to a single unknown block
+# solves it, and each solved block is XORed out of the frames still waiting.
+class StreamDecoder:
+    def __init__(self, stream_id, k, length, crc, block_size):
+        self.stream_id = stream_id
+        self.k = k
+        self.length = length
+        self.crc = crc
+        self.block_size = block_size
+        self.cdf = _degree_cdf(k)
+        self.blocks = [None] * k
+        self.known = 0
+        self.pending = []  # [[set of unknown indices, xor value]]
+        self.seen = set()
+
+    def complete(self):
+        return self.known == self.k
+
+    def add(self, seq, value):
+        if seq in self.seen or self.complete():
+            return
+        self.seen.add(seq)
+        indices = set()
+        for i in frame_blocks(self.stream_id, self.k, seq, self.cdf):
+            if self.blocks[i] is None:
+                indices.add(i)
+            else:
+                value ^= self.blocks[i]
+        if len(indices) == 1:
+            self._solve(indices.pop(), value)
+        elif indices:
+            self.pending.append([indices, value])
+
+    def _solve(self, index, value):
+        solved = [(index, value)]
+        while solved:
+            index, value = solved.pop()
+            if self.blocks[index] is not None:
+                continue
+            self.blocks[index] = value
+            self.known += 1
+            still_pending = []
+            for entry in self.pending:
+                if index in entry[0]:
+                    entry[0].discard(index)
+                    entry[1] ^= value
+                if len(entry[0]) == 1:
+                    solved.append((entry[0].pop(), entry[1]))
+                elif entry[0]:
+                    still_pending.append(entry)
+            self.pending = still_pending
+
+    def data(self):
+        data = b"".join(b.to_bytes(self.block_size, "big") for b in self.blocks)[:self.length]
+        if zlib.crc32(data) != self.crc:
+            raise ValueError("Stream checksum mismatch")
+        return data
+
+
+# Tracks every stream seen by the scanner. add() returns
+# (stream_id, blocks known, block count, records); records is None until the stream
+# completes and is returned exactly once.
+class StreamAssembler:
+    def __init__(self):
+        self.streams = {}
+        self.finished = set()
+
+    def add(self, text):
+        if isinstance(text, bytes):
+            text = text.decode("ascii")
+        raw = base45_decode(text[len(STREAM_PREFIX):])
+        stream_id, k, length, crc, seq = HEADER.unpack_from(raw)
+        block = raw[HEADER.size:]
+        key = (stream_id, crc)
+        if key in self.finished:
+            return stream_id, k, k, None
+        decoder = self.streams.get(key)
+        if decoder is None:
+            decoder = self.streams[key] = StreamDecoder(stream_id, k, length, crc, len(block))
+        decoder.add(seq, int.from_bytes(block, "big"))
+        if not decoder.complete():
+            return stream_id, decoder.known, k, None
+        # The stream only counts as finished once it decodes; a corrupt frame fails
+        # the checksum, and dropping the decoder lets later frames rebuild the stream
+        del self.streams[key]
+        records = decode_records(decoder.data())
+        self.finished.add(key)
+        return stream_id, k, k, records
@@ -0,0 +1,148 @@
+import argparse
+import json
+import threading
+import time
+from collections import Counter, deque
+
+# Per-frame instrumentation for the scanner. Stage timings (see STAGES) and
+# capture-to-handled latency go into fixed-size rolling windows, so percentiles
+# describe the last few seconds of scanning rather than the whole run.
+# Counters track frames and codes. A snapshot is appended to a JSON-lines log every
+# `log_interval` seconds and once more on close.
+#
+# Scanning code holds `metrics = None` when instrumentation is off, and every hook
+# sits behind an `if metrics is not None` check, so a disabled run pays one
+# comparison per hook.
+
+DEFAULT_WINDOW = 300
+DEFAULT_LOG_INTERVAL = 1.0
+PERCENTILES = (50, 90, 99)
+# handle is the whole on_codes callback for a frame; within it, parse is decoding one
+# payload and sink is writing one new record to the outputs (files, SQLite, Sheets)
+STAGES = ("capture", "decode", "handle", "parse", "sink", "display", "latency")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ScanMetrics:
+    def __init__(self, log_path=None, window=DEFAULT_WINDOW, log_interval=DEFAULT_LOG_INTERVAL,
+                 clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.stages = {name: deque(maxlen=window) for name in STAGES}
+        self.frame_times = deque(maxlen=window)   # when each frame finished being handled
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.log_lock = threading.Lock()
+        self.log_interval = log_interval
+        self.next_log = self.started + log_interval
+        self.log = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    # Seconds spent in one stage for one frame; safe to call from any thread
+    def stage(self, name, seconds):
+        self.stages[name].append(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+    # A frame's results were handled; `captured` is the clock() time it was read
+    def frame_done(self, captured):
+        now = self.clock()
+        self.frame_times.append(now)
+        self.stages["latency"].append(now - captured)
+        self.count("frames_handled")
+
+    def fps(self):
+        times = list(self.frame_times)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stage_summary(self, name):
+        values = sorted(self.stages[name])
+        if not values:
+            return {"count": 0}
+        summary = {"count": len(values), "mean_ms": sum(values) / len(values) * 1000}
+        for p in PERCENTILES:
+            summary[f"p{p}_ms"] = percentile(values, p) * 1000
+        return summary
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        return {
+            "time": time.time(),
+            "elapsed": self.clock() - self.started,
+            "fps": self.fps(),
+            "stages": {name: self.stage_summary(name) for name in STAGES},
+            "counts": counts,
+        }
+
+    # Short status lines for drawing on the preview frame
+    def overlay_lines(self):
+        decode = self.stage_summary("decode")
+        latency = self.stage_summary("latency")
+        with self.lock:
+            counts = dict(self.counts)
+        return [
+            f"{self.fps():.1f} fps  decode p50 {decode.get('p50_ms', 0):.0f} ms"
+            f"  p90 {decode.get('p90_ms', 0):.0f} ms",
+            f"latency p90 {latency.get('p90_ms', 0):.0f} ms  dropped {counts.get('frames_dropped', 0)}",
+            f"codes {counts.get('codes', 0)}  new {counts.get('new', 0)}  dup {counts.get('duplicate', 0)}"
+            f"  bad {counts.get('malformed', 0)}  failed {counts.get('failed', 0)}",
+        ]
+
+    # Called from each scanner's main loop; writes a snapshot when one is due. Several
+    # cameras can share one ScanMetrics, so only the first caller past the deadline writes.
+    def tick(self):
+        if self.log is not None and self.clock() >= self.next_log:
+            with self.log_lock:
+                if self.clock() < self.next_log:
+                    return
+                self.next_log = self.clock() + self.log_interval
+                self.write_snapshot()
+
+    def write_snapshot(self):
+        if self.log is not None:
+            self.log.write(json.dumps(self.snapshot()) + "\n")
+            self.log.flush()
+
+    def close(self):
+        if self.log is not None:
+            self.write_snapshot()
+            self.log.close()
+            self.log = None
+
+
+def read_log(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a scanner metrics log.")
+    parser.add_argument("log", help="JSON-lines file written by ScanMetrics")
+    args = parser.parse_args()
+    snapshots = read_log(args.log)
+    if not snapshots:
+        print("Empty log.")
+        return
+    last = snapshots[-1]
+    print(f"{len(snapshots)} snapshots, {last['elapsed']:.1f}s, last {last['fps']:.1f} fps, "
+          f"peak {max(s['fps'] for s in snapshots):.1f} fps")
+    print(f"{'stage':<10}{'count':>7}{'mean ms':>9}" + "".join(f"{'p%d ms' % p:>9}" for p in PERCENTILES))
+    for name, summary in last["stages"].items():
+        if summary["count"]:
+            print(f"{name:<10}{summary['count']:>7}{summary['mean_ms']:>9.1f}"
+                  + "".join(f"{summary[f'p{p}_ms']:>9.1f}" for p in PERCENTILES))
+    print("  ".join(f"{name}={n}" for name, n in sorted(last["counts"].items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import queue
+import threading
+import time
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 4
+
+
+# Sleeps just enough between reads to hold a source to `fps` frames per second
+class _Pacer:
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps else 0
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        if self.interval:
+            delay = self.next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time = max(self.next_time, time.monotonic() - self.interval) + self.interval
+
+
+# Frame source that replays a list of frames, used in place of cv2.VideoCapture
+# to drive the scanner headlessly. Mirrors the read()/release() interface.
+# With `load` the list holds file paths and each frame is loaded as it is read;
+# files that fail to load (load returns None) are dropped.
+class FrameListSource:
+    def __init__(self, frames, fps=None, loop=False, load=None):
+        self.frames = list(frames)
+        self.pacer = _Pacer(fps)
+        self.loop = loop
+        self.load = load
+        self.index = 0
+
+    def read(self):
+        while True:
+            if self.index >= len(self.frames):
+                if not self.loop or not self.frames:
+                    return False, None
+                self.index = 0
+            frame = self.frames[self.index]
+            self.index += 1
+            if self.load is not None:
+                frame = self.load(frame)
+                if frame is None:
+                    # Drop unreadable files so a looping source cannot spin on them
+                    self.index -= 1
+                    del self.frames[self.index]
+                    continue
+            self.pacer.wait()
+            return True, frame
+
+    def release(self):
+        pass
+
+
+# Caps any read()/release() source (a camera, a video file) at `fps` frames per second
+class ThrottledSource:
+    def __init__(self, source, fps):
+        self.source = source
+        self.pacer = _Pacer(fps)
+
+    def read(self):
+        self.pacer.wait()
+        return self.source.read()
+
+    def release(self):
+        self.source.release()
+
+
+# Capture -> decode -> display pipeline.
+#   - a capture thread reads frames and keeps only the newest ones: when the decode
+#     queue is full the oldest queued frame is dropped (frame skipping under load)
+#   - a pool of decode worker threads runs `decode(frame)` (pyzbar releases the GIL)
+#   - the calling thread drains results, hands codes to `on_codes` and shows frames
+#     through `display(frame, codes)`, which returns False to stop
+# The stages are joined by bounded queues, so memory stays flat however slow decoding is.
+# Pass a ScanMetrics as `metrics` to time every stage; with None nothing is measured.
+class ScannerPipeline:
+    def __init__(self, source, decode, on_codes, display=None, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, drop_frames=True, metrics=None):
+        self.source = source
+        self.decode = decode
+        self.on_codes = on_codes
+        self.display = display
+        self.workers = max(1, workers)
+        self.drop_frames = drop_frames
+        self.metrics = metrics
+        self.frame_queue = queue.Queue(maxsize=max(1, queue_size))
+        self.result_queue = queue.Queue(maxsize=max(1, queue_size) * self.workers)
+        self.stop_event = threading.Event()
+        self.capture_done = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_decoded = 0
+        self.capture_failed = False
+        self.workers_left = self.workers
+        self.latest_frame = (-1, None, 0)
+        self.latest_codes = []
+        self.last_shown = -1
+
+    def _capture_loop(self):
+        seq = 0
+        metrics = self.metrics
+        captured = 0
+        try:
+            while not self.stop_event.is_set():
+                if metrics is not None:
+                    started = metrics.clock()
+                ret, frame = self.source.read()
+                if not ret:
+                    self.capture_failed = True
+                    break
+                if metrics is not None:
+                    captured = metrics.clock()
+                    metrics.stage("capture", captured - started)
+                    metrics.count("frames_read")
+                self.frames_read += 1
+                item = (seq, frame, captured)
+                self.latest_frame = item
+                seq += 1
+                if self.drop_frames:
+                    while True:
+                        try:
+                            self.frame_queue.put_nowait(item)
+                            break
+                        except queue.Full:
+                            try:
+                                self.frame_queue.get_nowait()
+                                self.frames_dropped += 1
+                                if metrics is not None:
+                                    metrics.count("frames_dropped")
+                            except queue.Empty:
+                                pass
+                else:
+                    while not self.stop_event.is_set():
+                        try:
+                            self.frame_queue.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+        finally:
+            self.capture_done.set()
+
+    def _decode_loop(self):
+        metrics = self.metrics
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    seq, frame, captured = self.frame_queue.get(timeout=0.05)
+                except queue.Empty:
+                    if self.capture_done.is_set():
+                        break
+                    continue
+                if metrics is not None:
+                    started = metrics.clock()
+                codes = self.decode(frame)
+                if metrics is not None:
+                    metrics.stage("decode", metrics.clock() - started)
+                with self.lock:
+                    self.frames_decoded += 1
+                while not self.stop_event.is_set():
+                    try:
+                        self.result_queue.put((seq, frame, codes, captured), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            with self.lock:
+                self.workers_left -= 1
+
+    def start(self):
+        self.threads = [threading.Thread(target=self._capture_loop, name="scanner-capture", daemon=True)]
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self._decode_loop, name=f"scanner-decode-{i}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.source.release()
+
+    # Run until the source is exhausted, the display asks to stop or stop_event is set
+    # from another thread. The display shows the newest captured frame with the most
+    # recent decode results, so a slow decode never stalls the preview.
+    def run(self):
+        self.start()
+        metrics = self.metrics
+        latest_codes_seq = -1
+        try:
+            while True:
+                if metrics is not None:
+                    metrics.tick()
+                try:
+                    seq, frame, codes, captured = self.result_queue.get(timeout=0.01)
+                    if codes:
+                        if metrics is not None:
+                            started = metrics.clock()
+                            metrics.count("codes", len(codes))
+                        self.on_codes(codes)
+                        if metrics is not None:
+                            metrics.stage("handle", metrics.clock() - started)
+                    if metrics is not None:
+                        metrics.frame_done(captured)
+                    # Frames finish out of order with several workers; keep the newest
+                    if seq > latest_codes_seq:
+                        latest_codes_seq = seq
+                        self.latest_codes = codes
+                except queue.Empty:
+                    with self.lock:
+                        finished = self.workers_left == 0
+                    if finished and self.result_queue.empty():
+                        break
+                if self.display is not None:
+                    seq, frame, _ = self.latest_frame
+                    if seq > self.last_shown:
+                        self.last_shown = seq
+                        if metrics is not None:
+                            started = metrics.clock()
+                        keep_going = self.display(frame, self.latest_codes)
+                        if metrics is not None:
+                            metrics.stage("display", metrics.clock() - started)
+                        if keep_going is False:
+                            break
+        finally:
+            self.stop()
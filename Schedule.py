@@ -0,0 +1,63 @@
+import csv
+import os
+import re
+
+# Event match schedule, read from a local CSV file with one row per match:
+#
+#   match,red1,red2,red3,blue1,blue2,blue3
+#   1,254,1678,118,971,2056,4414
+#
+# Match numbers become the app's "Match N" names. A team -> match index is built
+# once at load time so finding a team's matches never scans the schedule. Without
+# a schedule file the app falls back to numbered matches with no teams.
+
+STATIONS = ["Red 1", "Red 2", "Red 3", "Blue 1", "Blue 2", "Blue 3"]
+DEFAULT_MATCH_COUNT = 62
+
+
+def match_name(value):
+    value = str(value).strip()
+    return f"Match {value}" if re.fullmatch(r"\d+", value) else value
+
+
+class Schedule:
+    def __init__(self, matches):
+        self.names = [name for name, _ in matches]
+        self.teams = [list(teams) for _, teams in matches]   # 6 teams in STATIONS order
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.team_index = {}
+        for i, teams in enumerate(self.teams):
+            for team in teams:
+                if team:
+                    self.team_index.setdefault(team, []).append(i)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def numbered(cls, count=DEFAULT_MATCH_COUNT):
+        return cls([(f"Match {i + 1}", [""] * len(STATIONS)) for i in range(count)])
+
+    @classmethod
+    def load(cls, path, default_count=DEFAULT_MATCH_COUNT):
+        if not path or not os.path.exists(path):
+            return cls.numbered(default_count)
+        matches = []
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if not row or not row[0].strip() or row[0].strip().lower() == "match":
+                    continue
+                teams = [cell.strip() for cell in row[1:1 + len(STATIONS)]]
+                matches.append((match_name(row[0]), teams + [""] * (len(STATIONS) - len(teams))))
+        return cls(matches)
+
+    # Positions of the team's matches in schedule order
+    def matches_for(self, team):
+        return self.team_index.get(str(team).strip(), [])
+
+    # (team, alliance color) scouted from `station` ("Red 1" ... "Blue 3") in a match
+    def assignment(self, match, station):
+        i = self.index.get(match)
+        if i is None or station not in STATIONS:
+            return "", None
+        return self.teams[i][STATIONS.index(station)], station.split()[0]
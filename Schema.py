@@ -0,0 +1,108 @@
+import csv
+
+# Single definition of the "Raw" sheet columns, shared by the app, the scanner and
+# every local export. Each column is (id, section, header, path into the match record,
+# default, formatter).
+
+COUNTER_KEYS = ["L1", "L2", "L3", "L4", "Algae Removed", "Algae Processed", "Algae Netted"]
+
+
+# Starting position rectangle as "x1,y1,x2,y2"
+def format_coords(coords):
+    return ",".join(map(str, coords)) if coords else ""
+
+
+COLUMNS = (
+    [("match", "Info", "Match", ("match_number",), "", None),
+     ("team", "Info", "Team", ("team_number",), "", None),
+     ("alliance", "Info", "Alliance", ("selected_color",), "", None),
+     ("scout", "Info", "Scout Name", ("scouter_name",), "", None)]
+    + [("auto_" + k, "Auto", k, ("auto", "counters", k), 0, None) for k in COUNTER_KEYS]
+    + [("auto_moved", "Auto", "Move State", ("auto", "moved_state"), "", None),
+       ("auto_start", "Auto", "Starting Pos", ("auto", "robot_coords"), "", format_coords),
+       ("auto_comment", "Auto", "Comment", ("auto", "comment"), "", None)]
+    + [("teleop_" + k, "TeleOp", k, ("teleop", "counters", k), 0, None) for k in COUNTER_KEYS]
+    + [("teleop_climb", "TeleOp", "Climb State", ("teleop", "climb_state"), "", None),
+       ("teleop_broken", "TeleOp", "Broken", ("teleop", "teleop_broken_state"), "", None),
+       ("teleop_comment", "TeleOp", "Comment", ("teleop", "comment"), "", None)]
+)
+
+COLUMN_IDS = [c[0] for c in COLUMNS]
+# Integer counter columns; everything else is text
+NUMERIC_COLUMNS = [c[0] for c in COLUMNS if c[4] == 0]
+
+
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+# Two header rows: section names over the first column of each section, then titles
+HEADER_ROW1 = [section if i == 0 or COLUMNS[i - 1][1] != section else ""
+               for i, (_, section, _, _, _, _) in enumerate(COLUMNS)]
+HEADER_ROW2 = [c[2] for c in COLUMNS]
+HEADER_RANGE = f"A1:{column_letter(len(COLUMNS) - 1)}2"
+
+
+# Build encode_row as straight-line code: every nested dict is looked up once and each
+# column is a single .get(), instead of walking the column table for every record.
+def _compile_encoder():
+    lines = ["def encode_row(data):"]
+    parents = {(): "data"}
+    for _, _, _, path, _, _ in COLUMNS:
+        for depth in range(1, len(path)):
+            parent = path[:depth]
+            if parent not in parents:
+                name = f"d{len(parents)}"
+                lines.append(f"    {name} = {parents[parent[:-1]]}.get({parent[-1]!r}) or {{}}")
+                parents[parent] = name
+    namespace = {}
+    values = []
+    for i, (_, _, _, path, default, formatter) in enumerate(COLUMNS):
+        value = f"{parents[path[:-1]]}.get({path[-1]!r}, {default!r})"
+        if formatter is not None:
+            namespace[f"f{i}"] = formatter
+            value = f"f{i}({value})"
+        values.append(value)
+    lines.append("    return [" + ", ".join(values) + "]")
+    exec("\n".join(lines), namespace)
+    return namespace["encode_row"]
+
+
+encode_row = _compile_encoder()
+
+
+def encode_rows(records):
+    encode = encode_row
+    return [encode(record) for record in records]
+
+
+# Column-oriented view of a batch: {column id: values}. With NumPy available the
+# counter columns become int32 arrays and the rest object arrays.
+def encode_columns(records, use_numpy=True):
+    columns = list(zip(*encode_rows(records))) or [()] * len(COLUMNS)
+    if use_numpy:
+        try:
+            import numpy as np
+        except ImportError:
+            use_numpy = False
+    result = {}
+    for column_id, values in zip(COLUMN_IDS, columns):
+        if not use_numpy:
+            result[column_id] = list(values)
+        elif column_id in NUMERIC_COLUMNS:
+            result[column_id] = np.fromiter(values, dtype=np.int32, count=len(values))
+        else:
+            result[column_id] = np.array(values, dtype=object)
+    return result
+
+
+def write_csv(path, records):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER_ROW2)
+        writer.writerows(encode_rows(records))
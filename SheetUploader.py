@@ -0,0 +1,319 @@
+import json
+import os
+import random
+import re
+import time
+from Schema import COLUMNS, COLUMN_IDS, HEADER_ROW1, HEADER_ROW2, HEADER_RANGE, column_letter, encode_rows
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 32.0
+HEADER_ROWS = 2
+# Columns that identify a row for upserts: Match, Team, Scout Name
+KEY_COLUMNS = [COLUMN_IDS.index(c) for c in ("match", "team", "scout")]
+KEY_RANGE = f"A{HEADER_ROWS + 1}:{column_letter(max(KEY_COLUMNS))}"
+LAST_COLUMN = column_letter(len(COLUMNS) - 1)
+
+
+def row_key(row):
+    return tuple(str(row[i]).strip() if i < len(row) else "" for i in KEY_COLUMNS)
+
+
+# First row number of an A1 range such as "'Q2 Data'!A5:X7"; the sheet title before
+# the last "!" may itself contain letters followed by digits
+def _first_row(range_name):
+    match = re.match(r"\$?[A-Z]+\$?(\d+)", (range_name or "").rpartition("!")[2])
+    return int(match.group(1)) if match else None
+
+
+# Raised for failures worth retrying (rate limits, server errors, dropped connections)
+class TransientSheetError(Exception):
+    pass
+
+
+class GspreadSheet:
+    # Authorizes and resolves the worksheet once, then reuses it for every call.
+    def __init__(self, spreadsheet_id, sheet_name, credentials_path):
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+        self._api_error = gspread.exceptions.APIError
+        scope = ['https://www.googleapis.com/auth/spreadsheets',
+                 'https://www.googleapis.com/auth/drive']
+        creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
+        client = gspread.authorize(creds)
+        spreadsheet = client.open_by_key(spreadsheet_id)
+        try:
+            self.sheet = spreadsheet.worksheet(sheet_name)
+        except gspread.exceptions.WorksheetNotFound:
+            self.sheet = spreadsheet.add_worksheet(title=sheet_name, rows="100", cols="26")
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except self._api_error as e:
+            status = getattr(getattr(e, "response", None), "status_code", 0)
+            if status == 429 or status >= 500:
+                raise TransientSheetError(str(e)) from e
+            raise
+        except OSError as e:
+            # requests' connection/timeout errors are OSError subclasses
+            raise TransientSheetError(str(e)) from e
+
+    def row_values(self, row):
+        return self._call(self.sheet.row_values, row)
+
+    def update(self, range_name, values):
+        return self._call(self.sheet.update, values=values, range_name=range_name)
+
+    def append_rows(self, rows, value_input_option="USER_ENTERED"):
+        return self._call(self.sheet.append_rows, rows, value_input_option=value_input_option)
+
+    def get_values(self, range_name):
+        return self._call(self.sheet.get_values, range_name)
+
+    # data: [{"range": "A5:X5", "values": [[...]]}, ...], written in one request
+    def batch_update(self, data, value_input_option="USER_ENTERED"):
+        return self._call(self.sheet.batch_update, data, value_input_option=value_input_option)
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+class FakeSheet:
+    # Local stand-in for a worksheet so batching and retries can be exercised offline.
+    # Rows are kept in memory (and mirrored to a JSON file when a path is given);
+    # every API-style call is recorded in `calls`.
+    def __init__(self, path=None):
+        self.path = path
+        self.rows = []
+        self.calls = []
+        self.pending_failures = 0
+        self.pending_late_failures = 0
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.rows = json.load(f)
+
+    # Make the next `count` calls fail with a TransientSheetError
+    def fail_next(self, count):
+        self.pending_failures += count
+
+    # Make the next `count` writes apply and then fail, like a timeout that arrives
+    # after the server already took the request
+    def fail_after_next(self, count):
+        self.pending_late_failures += count
+
+    def _begin(self, name):
+        self.calls.append(name)
+        if self.pending_failures > 0:
+            self.pending_failures -= 1
+            raise TransientSheetError(f"Simulated failure in {name}")
+
+    def _save(self):
+        if self.path:
+            with open(self.path, "w") as f:
+                json.dump(self.rows, f)
+        if self.pending_late_failures > 0:
+            self.pending_late_failures -= 1
+            raise TransientSheetError(f"Simulated timeout after {self.calls[-1]} was applied")
+
+    def row_values(self, row):
+        self._begin("row_values")
+        if row - 1 < len(self.rows):
+            values = list(self.rows[row - 1])
+            while values and values[-1] == "":
+                values.pop()
+            return values
+        return []
+
+    def _write(self, start_row, values):
+        for offset, row in enumerate(values):
+            index = start_row - 1 + offset
+            while len(self.rows) <= index:
+                self.rows.append([])
+            self.rows[index] = list(row)
+
+    def update(self, range_name, values):
+        self._begin("update")
+        self._write(_first_row(range_name), values)
+        self._save()
+
+    # Like the Sheets API, reports where the rows landed
+    def append_rows(self, rows, value_input_option="USER_ENTERED"):
+        self._begin("append_rows")
+        while self.rows and not any(cell != "" for cell in self.rows[-1]):
+            self.rows.pop()
+        start = len(self.rows) + 1
+        self.rows.extend(list(row) for row in rows)
+        self._save()
+        return {"updates": {"updatedRange": f"Sheet!A{start}:{LAST_COLUMN}{len(self.rows)}"}}
+
+    def get_values(self, range_name):
+        self._begin("get_values")
+        match = re.fullmatch(r"([A-Z]+)(\d+):([A-Z]+)(\d*)", range_name)
+        first, last = _column_index(match.group(1)), _column_index(match.group(3))
+        start = int(match.group(2)) - 1
+        end = int(match.group(4)) if match.group(4) else len(self.rows)
+        values = [[str(cell) for cell in row[first:last + 1]] for row in self.rows[start:end]]
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def batch_update(self, data, value_input_option="USER_ENTERED"):
+        self._begin("batch_update")
+        for item in data:
+            self._write(_first_row(item["range"]), item["values"])
+        self._save()
+
+
+class SheetUploader:
+    # Pushes flattened rows with as few API calls as possible: the header is checked
+    # once per uploader and rows go out in `append_rows` batches of `batch_size`.
+    # Transient failures are retried with exponential backoff and jitter.
+    #
+    # With upsert=True a row whose (Match, Team, Scout Name) is already in the sheet is
+    # overwritten in place instead of appended again. Other devices append to the same
+    # sheet and people delete rows by hand, so every upsert call first reads the key
+    # columns into a key -> row number index; each call then costs that read, one
+    # `batch_update` for changed rows and one `append_rows` for new ones.
+    #
+    # Appends are not idempotent: a timeout can arrive after the rows were written. So
+    # the end of the sheet is noted before the first attempt, and before a retry the
+    # key columns are read back; if the batch starts exactly at that old end the
+    # append counts as done. Matching rows elsewhere (the same records appended by an
+    # earlier call) do not count.
+    def __init__(self, sheet, batch_size=DEFAULT_BATCH_SIZE, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF, sleep=time.sleep, upsert=False):
+        self.sheet = sheet
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.header_checked = False
+        self.upsert = upsert
+        self.row_index = None   # key -> sheet row number, re-read by every upsert call
+        self.next_row = None
+
+    def _pause(self, attempt, error):
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        delay += random.uniform(0, delay / 2)
+        print(f"Sheets request failed ({error}); retrying in {delay:.1f}s")
+        self.sleep(delay)
+
+    def _retry(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except TransientSheetError as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._pause(attempt, e)
+                attempt += 1
+
+    # Key columns without the empty rows at the bottom
+    def _key_values(self):
+        values = self._retry(self.sheet.get_values, KEY_RANGE)
+        while values and not any(values[-1]):
+            values = values[:-1]
+        return values
+
+    # Where the batch landed if a failed append was in fact applied, else None.
+    # `first` is the row the append would have started at.
+    def _landed(self, batch, first):
+        offset = first - HEADER_ROWS - 1
+        placed = self._key_values()[offset:offset + len(batch)]
+        if [row_key(r) for r in placed] != [row_key(r) for r in batch]:
+            return None
+        return {"updates": {"updatedRange": f"A{first}:{LAST_COLUMN}{first + len(batch) - 1}"}}
+
+    # `first` is the first free row, read before the append; None reads it now
+    def _append(self, batch, first=None):
+        if first is None:
+            first = HEADER_ROWS + 1 + len(self._key_values())
+        attempt = 0
+        while True:
+            try:
+                return self.sheet.append_rows(batch, value_input_option="USER_ENTERED")
+            except TransientSheetError as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._pause(attempt, e)
+                attempt += 1
+                landed = self._landed(batch, first)
+                if landed is not None:
+                    print("The failed append had reached the sheet; not sending it again.")
+                    return landed
+
+    def ensure_header(self):
+        if self.header_checked:
+            return
+        # If the sheet is empty, add headers in two rows
+        if not self._retry(self.sheet.row_values, 1):
+            self._retry(self.sheet.update, HEADER_RANGE, [HEADER_ROW1, HEADER_ROW2])
+        self.header_checked = True
+
+    # Flatten match records with the shared schema and send them
+    def upload(self, records):
+        return self.send_rows(encode_rows(records))
+
+    def send_rows(self, rows):
+        return self.upsert_rows(rows) if self.upsert else self.append_rows(rows)
+
+    def append_rows(self, rows):
+        rows = list(rows)
+        if not rows:
+            return 0
+        self.ensure_header()
+        first = None
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            result = self._append(batch, first)
+            # The next batch starts after this one; unknown if the API did not say
+            first = _first_row(((result or {}).get("updates") or {}).get("updatedRange"))
+            if first is not None:
+                first += len(batch)
+        return len(rows)
+
+    def _load_index(self):
+        values = self._key_values()
+        self.row_index = {}
+        for offset, row in enumerate(values):
+            key = row_key(row)
+            if any(key):
+                self.row_index[key] = HEADER_ROWS + 1 + offset
+        self.next_row = HEADER_ROWS + 1 + len(values)
+
+    def upsert_rows(self, rows):
+        # The last copy of a key in the batch wins
+        latest = {}
+        for row in rows:
+            latest[row_key(row)] = list(row)
+        if not latest:
+            return 0
+        self.ensure_header()
+        try:
+            self._load_index()
+            updates = [(self.row_index[key], row) for key, row in latest.items() if key in self.row_index]
+            new = [(key, row) for key, row in latest.items() if key not in self.row_index]
+            for start in range(0, len(updates), self.batch_size):
+                data = [{"range": f"A{r}:{LAST_COLUMN}{r}", "values": [row]}
+                        for r, row in updates[start:start + self.batch_size]]
+                self._retry(self.sheet.batch_update, data, value_input_option="USER_ENTERED")
+            for start in range(0, len(new), self.batch_size):
+                batch = new[start:start + self.batch_size]
+                result = self._append([row for _, row in batch], self.next_row)
+                # Trust the row the API reports; fall back to the end of the sheet as read
+                first = _first_row(((result or {}).get("updates") or {}).get("updatedRange")) or self.next_row
+                for offset, (key, _) in enumerate(batch):
+                    self.row_index[key] = first + offset
+                self.next_row = max(self.next_row, first + len(batch))
+        except Exception:
+            self.row_index = None
+            raise
+        return len(latest)
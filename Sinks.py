@@ -0,0 +1,108 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+from Schema import HEADER_ROW2, COLUMN_IDS, NUMERIC_COLUMNS, encode_row
+
+
+# Destinations for newly ingested records. Each sink takes records one at a time
+# through write() and must be close()d to flush anything it buffers.
+
+class JsonLinesSink:
+    # Appends one JSON object per line to a local file, or to stdout for path "-"
+    def __init__(self, path):
+        # stdout is only borrowed; it may be redirected by the time close() runs
+        self.owns_file = path != "-"
+        self.file = open(path, "a") if self.owns_file else sys.stdout
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+
+class CsvSink:
+    # Appends sheet-layout rows to a local CSV file, writing the header for a new file
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(HEADER_ROW2)
+
+    def write(self, record):
+        self.writer.writerow(encode_row(record))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SheetSink:
+    # Buffers flattened rows and sends them through a SheetUploader in batches.
+    # on_sent(records), when set, is called with each batch once it is in the sheet.
+    def __init__(self, uploader, on_sent=None):
+        self.uploader = uploader
+        self.on_sent = on_sent
+        self.rows = []
+        self.records = []
+
+    def write(self, record):
+        self.rows.append(encode_row(record))
+        self.records.append(record)
+        if len(self.rows) >= self.uploader.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.uploader.send_rows(self.rows)
+            records = self.records
+            self.rows = []
+            self.records = []
+            if self.on_sent is not None:
+                self.on_sent(records)
+
+    def close(self):
+        self.flush()
+
+
+class SqliteSink:
+    # One row per (match, team, scout) in a local SQLite table with the sheet's
+    # columns plus the full record as JSON; a rescanned record replaces its row.
+    # Scanner threads write through it one at a time (RecordCollector holds a lock),
+    # so the connection may be used from a thread other than the one that opened it.
+    def __init__(self, path, table="matches"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        columns = ", ".join(f'"{c}" {"INTEGER" if c in NUMERIC_COLUMNS else "TEXT"}' for c in COLUMN_IDS)
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns}, record TEXT, '
+                          f'PRIMARY KEY (match, team, scout))')
+        self.insert = (f'INSERT OR REPLACE INTO "{table}" VALUES '
+                       f'({", ".join("?" * (len(COLUMN_IDS) + 1))})')
+
+    def write(self, record):
+        self.conn.execute(self.insert, encode_row(record) + [json.dumps(record)])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class OutboxSink:
+    # Queues records in an UploadOutbox, whose own thread uploads them, so write() only
+    # touches a local journal and never waits on the network. Records still pending
+    # at close() get one last upload attempt; the rest go out on the next run.
+    # key(record) -> the outbox key; re-scanned versions of a record replace each other
+    def __init__(self, outbox, key):
+        self.outbox = outbox
+        self.key = key
+        outbox.start()
+
+    def write(self, record):
+        self.outbox.enqueue(self.key(record), record)
+
+    def close(self):
+        self.outbox.stop(flush=True)
@@ -0,0 +1,131 @@
+import threading
+import time
+from MatchStore import MatchStore
+from SheetUploader import SheetUploader, DEFAULT_BATCH_SIZE
+
+PENDING = "pending"
+SENT = "sent"
+# Seconds to wait before retrying after a failed flush, doubling up to the maximum
+RETRY_DELAY = 5.0
+MAX_RETRY_DELAY = 300.0
+
+
+# Persistent queue of records waiting to go to the sheet. Entries live in a MatchStore
+# journal ({"record", "state", "attempts", "updated"}) so pending uploads survive a
+# restart. A background thread connects once through `make_sheet`, coalesces pending
+# records into batched appends and marks each batch sent as soon as it lands; failures
+# are retried with backoff. The Tk thread only calls enqueue() and status().
+class UploadOutbox:
+    def __init__(self, path, make_sheet, batch_size=DEFAULT_BATCH_SIZE,
+                 retry_delay=RETRY_DELAY, max_retry_delay=MAX_RETRY_DELAY, uploader_options=None):
+        self.store = MatchStore(path)
+        self.make_sheet = make_sheet
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.uploader_options = uploader_options or {}
+        self.uploader = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = None
+        self.last_error = None
+        self.uploading = False
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="upload-outbox", daemon=True)
+            self.thread.start()
+            self.wake.set()
+
+    # With flush=True, records still pending get one last upload attempt first;
+    # whatever fails stays in the journal for the next run
+    def stop(self, flush=False):
+        self.stopping = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            if self.thread.is_alive():
+                # Still blocked in a request; leave the journal open for it
+                return
+        if flush:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Upload failed ({str(e) or type(e).__name__}); "
+                      f"{self.status()['pending']} records stay queued for the next run.")
+        self.store.close()
+
+    # Queue (or re-queue, after an edit) a record for upload
+    def enqueue(self, key, record):
+        with self.lock:
+            previous = self.store.get(key) or {}
+            self.store[key] = {"record": record, "state": PENDING,
+                               "attempts": previous.get("attempts", 0), "updated": time.time()}
+        self.wake.set()
+
+    # With `record`, only true if that exact version was the one sent
+    def is_sent(self, key, record=None):
+        with self.lock:
+            entry = self.store.get(key)
+        return bool(entry) and entry["state"] == SENT and (record is None or entry["record"] == record)
+
+    def status(self):
+        with self.lock:
+            states = [entry["state"] for entry in self.store.values()]
+        return {"pending": states.count(PENDING), "sent": states.count(SENT),
+                "uploading": self.uploading, "last_error": self.last_error}
+
+    def _pending(self):
+        with self.lock:
+            return [(key, entry["record"], entry["updated"]) for key, entry in self.store.items()
+                    if entry["state"] == PENDING]
+
+    def _mark(self, batch, state):
+        with self.lock:
+            for key, _, updated in batch:
+                entry = self.store.get(key)
+                # Skip records edited again while this batch was in flight
+                if entry is None or entry["updated"] != updated:
+                    continue
+                self.store[key] = dict(entry, state=state, attempts=entry["attempts"] + 1)
+
+    def flush(self):
+        pending = self._pending()
+        if not pending:
+            return 0
+        if self.uploader is None:
+            self.uploader = SheetUploader(self.make_sheet(), batch_size=self.batch_size, **self.uploader_options)
+        sent = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            self.uploader.upload([record for _, record, _ in batch])
+            self._mark(batch, SENT)
+            sent += len(batch)
+        return sent
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self.stopping:
+            self.wake.wait()
+            self.wake.clear()
+            if self.stopping:
+                break
+            self.uploading = True
+            try:
+                self.flush()
+                self.last_error = None
+                delay = self.retry_delay
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                print(f"Upload failed ({self.last_error}); retrying in {delay:.0f}s")
+                # Reconnect from scratch next time in case the session went bad
+                self.uploader = None
+                self.uploading = False
+                if self.wake.wait(delay):
+                    # Woken early by a new record; keep the current backoff step
+                    continue
+                delay = min(self.max_retry_delay, delay * 2)
+                self.wake.set()
+            finally:
+                self.uploading = False